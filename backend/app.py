@@ -10,42 +10,51 @@ from datetime import datetime
 # from solders.pubkey import Pubkey
 # from solana.transaction import Transaction
 import openfoodfacts
+from werkzeug.exceptions import RequestEntityTooLarge
+
+from phash_index import dhash_or_none, photos
+import submission_store
+from uploads import install as install_uploads, sha256_of
 
 app = Flask(__name__)
 CORS(app)
+install_uploads(app)
 
-# In-memory storage for demo purposes
-# In production, use a proper database
-submissions = []
-
-def get_solana_client(use_testnet=True):
-    if use_testnet:
-        return Client("http://127.0.0.1:8899")
-    else:
-        return Client("https://api.mainnet-beta.solana.com")
-
-def record_disposal_proof(barcode_id, image_hash, wallet_address=None):
+def record_disposal_proof(barcode_id, image_hash, wallet_address=None, image_phash=None):
     try:
-        client = get_solana_client()
-        
         tx_id = str(uuid.uuid4())
 
-        payer = Keypair()
-
         combined_hash = hashlib.sha256(f"{barcode_id}:{image_hash}".encode()).hexdigest()
 
+        # Refuse a photo that is a re-encoded or re-cropped copy of an earlier one
+        if image_phash is not None:
+            seen = photos.claim(image_hash, image_phash)
+            if seen:
+                return {
+                    'success': False,
+                    'error': 'Similar image already submitted',
+                    'similar_to': seen[0]
+                }
+
         submission = {
             'id': tx_id,
             'barcode_id': barcode_id,
             'image_hash': image_hash,
             'combined_hash': combined_hash,
+            'image_phash': None if image_phash is None else f"{image_phash:016x}",
             'wallet_address': wallet_address,
             'timestamp': datetime.utcnow().isoformat(),
             'status': 'completed',
             'tokens_minted': 10,  # For demo, always mint 10 tokens
         }
 
-        submissions.append(submission)
+        try:
+            submission_store.add(submission)
+        except Exception:
+            # Not recorded, so free the photo for a retry
+            if image_phash is not None:
+                photos.release(image_hash)
+            raise
 
         print(f"💰 Simulated minting 10 tokens to wallet {wallet_address}")
         print(f"📝 Transaction recorded with ID: {tx_id}")
@@ -71,9 +80,10 @@ def receive_proof():
             return jsonify({'error': 'Missing barcode_id or image'}), 400
 
         barcode_id = request.form['barcode_id']
-        image_file = request.files['image']
-        image_data = image_file.read()
-        image_hash = hashlib.sha256(image_data).hexdigest()
+        image_hash = sha256_of(request.files['image'])
+        image_phash = dhash_or_none(request.files['image'].stream)
+        if image_phash is None:
+            return jsonify({'error': 'Image could not be decoded'}), 400
         
         # Get the user's wallet address
         wallet_address = request.form.get('wallet_address')
@@ -85,8 +95,15 @@ def receive_proof():
         print("👛 Wallet address:", wallet_address)
         
         # Record on blockchain and mint tokens
-        result = record_disposal_proof(barcode_id, image_hash, wallet_address)
+        result = record_disposal_proof(barcode_id, image_hash, wallet_address, image_phash)
         
+        if result.get('similar_to'):
+            return jsonify({
+                'status': 'error',
+                'message': result['error'],
+                'similar_to': result['similar_to']
+            }), 409
+
         if not result['success']:
             return jsonify({
                 'status': 'error',
@@ -104,18 +121,36 @@ def receive_proof():
             'wallet': wallet_address
         }), 200
 
+    except RequestEntityTooLarge:
+        raise
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
 @app.route('/api/submissions', methods=['GET'])
 def get_submissions():
-    """Get all recorded submissions"""
+    """
+    Newest-first page of recorded submissions. Optional filters: wallet,
+    barcode, since (ISO-8601). Pass next_cursor back as ?cursor= for the
+    following page; limit defaults to SUBMISSIONS_PAGE_SIZE.
+    """
     try:
-        # For a real app, you'd implement pagination
+        args = request.args
+        try:
+            cursor = int(args['cursor']) if 'cursor' in args else None
+            limit = int(args.get('limit', submission_store.PAGE_SIZE))
+            since = submission_store.parse_since(args['since']) if 'since' in args else None
+        except ValueError:
+            return jsonify({'error': 'Invalid cursor, limit or since'}), 400
+
+        items, next_cursor = submission_store.page(
+            wallet=args.get('wallet'), barcode=args.get('barcode'),
+            since=since, cursor=cursor, limit=limit
+        )
         return jsonify({
             'status': 'success',
-            'count': len(submissions),
-            'submissions': submissions
+            'count': len(items),
+            'submissions': items,
+            'next_cursor': None if next_cursor is None else str(next_cursor)
         }), 200
     except Exception as e:
         return jsonify({'error': str(e)}), 500
@@ -124,7 +159,7 @@ def get_submissions():
 def get_submission(submission_id):
     """Get a specific submission by ID"""
     try:
-        submission = next((s for s in submissions if s['id'] == submission_id), None)
+        submission = submission_store.get(submission_id)
         
         if not submission:
             return jsonify({'error': 'Submission not found'}), 404
@@ -4,7 +4,8 @@ server2.py
 
 Flask server with endpoints:
   • POST   /signup
-  • POST   /signin
+  • POST   /signin            — also returns a session token
+  • POST   /signout
   • POST   /api/validate
   • GET    /wallet/<pubkey>   — now returns stored info + SPL balance
 """
@@ -16,34 +17,25 @@ from flask import Flask, request, jsonify
 from flask_cors import CORS
 import openfoodfacts
 
-from solana.rpc.api import Client
 from solders.keypair import Keypair
-from spl.token.client import Token
-from spl.token.constants import TOKEN_PROGRAM_ID
 from solana.rpc.types import TxOpts
 from solders.pubkey import Pubkey
 
 from walletGen import generate_wallet
 from wallet_manager import add_wallet, wallet_exists, get_wallet_info, verify_password
-from tokenGen import mint_spl_token, load_keypair, LOCAL_RPC, MINT_ADDRESS, MINT_AUTHORITY_FILE
+from auth import check_token, issue_token, request_token, revoke
+from balances import get_owner_balance
+from tokenGen import mint_spl_token, LOCAL_RPC, MINT_ADDRESS
+from phash_index import photos
+from uploads import install as install_uploads, sha256_of
 
 app = Flask(__name__)
 CORS(app)
+install_uploads(app)
 
-def get_spl_balance(pubkey_str: str) -> int:
+def get_spl_balance(pubkey_str: str, fresh: bool = False) -> int:
     """Return the SPL token balance for the given public key."""
-    client = Client(LOCAL_RPC)
-    token = Token(
-        conn=client,
-        pubkey=Pubkey.from_string(MINT_ADDRESS),
-        program_id=TOKEN_PROGRAM_ID,
-        payer=load_keypair(MINT_AUTHORITY_FILE),
-    )
-    total = 0
-    for acct in token.get_accounts_by_owner(Pubkey.from_string(pubkey_str)).value:
-        bal = client.get_token_account_balance(Pubkey.from_string(str(acct.pubkey)))
-        total += int(bal.value.amount)
-    return total
+    return get_owner_balance(pubkey_str, MINT_ADDRESS, LOCAL_RPC, fresh=fresh)
 
 def barcode_handling(barcode_id: str) -> str:
     api = openfoodfacts.API(user_agent="MyApp/1.0")
@@ -58,11 +50,10 @@ def barcode_handling(barcode_id: str) -> str:
 
 @app.route("/signup", methods=["POST"])
 def signup():
-    wallet, password, wallet_file = generate_wallet()
-    add_wallet(str(wallet.pubkey()), wallet_file, password)
+    wallet, password = generate_wallet()
+    add_wallet(str(wallet.pubkey()), list(wallet.to_bytes()), password)
     return jsonify({
         "pubkey": str(wallet.pubkey()),
-        "wallet_file": wallet_file,
         "password": password
     })
 
@@ -70,37 +61,58 @@ def signup():
 def signin():
     data = request.get_json() or {}
     pk, pw = data.get("pubkey"), data.get("password")
-    if not pk or not pw:
+    token = request_token(data, request.headers)
+    if not pk or not (pw or token):
         return jsonify({"error":"pubkey & password required"}), 400
     if not wallet_exists(pk):
         return jsonify({"error":"wallet not found"}), 404
-    if not verify_password(pk, pw):
+    if not (token and check_token(token, pk)) and not (pw and verify_password(pk, pw)):
         return jsonify({"error":"invalid password"}), 403
     info   = get_wallet_info(pk)
     balance = get_spl_balance(pk)
     return jsonify({
         "wallet_info": info,
-        "spl_balance": balance
+        "spl_balance": balance,
+        "session_token": issue_token(pk)
     })
 
+@app.route("/signout", methods=["POST"])
+def signout():
+    token = request_token(request.get_json(silent=True) or {}, request.headers)
+    if token:
+        revoke(token)
+    return jsonify({"status": "signed out"})
+
 @app.route("/api/validate", methods=["POST"])
 def validate_and_mint():
     form, files = request.form, request.files
-    for f in ("barcode_id","pubkey","password"):
+    # A session token from /signin replaces the password and skips the wallet lookups
+    token = request_token(form, request.headers)
+    for f in ("barcode_id","pubkey") if token else ("barcode_id","pubkey","password"):
         if f not in form:
             return jsonify({"error":f"Missing {f}"}), 400
     if "image" not in files:
         return jsonify({"error":"Missing image"}), 400
 
-    b, pk, pw = form["barcode_id"], form["pubkey"], form["password"]
-    if not wallet_exists(pk):
+    b, pk = form["barcode_id"], form["pubkey"]
+    if token:
+        if not check_token(token, pk):
+            return jsonify({"error":"invalid or expired token"}), 401
+    elif not wallet_exists(pk):
         return jsonify({"error":"wallet not found"}), 404
-    if not verify_password(pk, pw):
+    elif not verify_password(pk, form["password"]):
         return jsonify({"error":"invalid credentials"}), 403
 
-    img_hash = hashlib.sha256(files["image"].read()).hexdigest()
-    sub_id   = barcode_handling(b)
-    tx       = mint_spl_token(pk)
+    img_hash = sha256_of(files["image"])
+    phash, seen = photos.claim_upload(files["image"], img_hash)
+    if phash is None:
+        return jsonify({"error": "image could not be decoded"}), 400
+    if seen:
+        return jsonify({"error": "similar image already submitted", "similar_to": seen[0]}), 409
+
+    with photos.held(img_hash):
+        sub_id   = barcode_handling(b)
+        tx       = mint_spl_token(pk)
     balance  = get_spl_balance(pk)
     return jsonify({
         "status": "success",
@@ -116,7 +128,7 @@ def wallet_info(pubkey):
     if not wallet_exists(pubkey):
         return jsonify({"error":"wallet not found"}), 404
     info    = get_wallet_info(pubkey)
-    balance = get_spl_balance(pubkey)
+    balance = get_spl_balance(pubkey, fresh=request.args.get("fresh") == "1")
     return jsonify({
         "wallet_info": info,
         "spl_balance": balance
@@ -12,27 +12,21 @@ from datetime import datetime
 from flask import Flask, request, jsonify
 from flask_cors import CORS
 
-import requests
 import openfoodfacts
 from solana.rpc.api import Client
 from solders.pubkey import Pubkey
 
 from walletGenMongo import generate_wallet
 from wallet_manager_mongo import add_wallet, wallet_exists, get_wallet_info, verify_password
+from auth import check_token, issue_token, request_token, revoke
 from tokenGenMongo import mint_spl_token, get_spl_balance
+from product_cache import fetch_product
+from phash_index import photos
+from uploads import install as install_uploads, sha256_of
 
 app = Flask(__name__)
 CORS(app)
-
-def fetch_product(barcode_id: str):
-    url = f"https://world.openfoodfacts.org/api/v0/product/{barcode_id}.json"
-    r = requests.get(url, timeout=5)
-    if r.status_code != 200:
-        return None
-    d = r.json()
-    if d.get("status") == 1:
-        return d["product"]
-    return None
+install_uploads(app)
 
 def map_score_to_tokens(score: int) -> int:
     return min(5, max(1, score // 20 + 1))
@@ -47,41 +41,61 @@ def signup():
 def signin():
     d = request.get_json() or {}
     pk, pw = d.get("pubkey"), d.get("password")
-    if not pk or not pw:
+    token = request_token(d, request.headers)
+    if not pk or not (pw or token):
         return jsonify({"error":"pubkey & password required"}),400
     if not wallet_exists(pk):
         return jsonify({"error":"wallet not found"}),404
-    if not verify_password(pk,pw):
+    if not (token and check_token(token,pk)) and not (pw and verify_password(pk,pw)):
         return jsonify({"error":"invalid password"}),403
     info    = get_wallet_info(pk)
     spl_bal = get_spl_balance(pk)
-    return jsonify({"wallet_info":info,"spl_balance":spl_bal})
+    return jsonify({"wallet_info":info,"spl_balance":spl_bal,"session_token":issue_token(pk)})
+
+@app.route("/signout", methods=["POST"])
+def signout():
+    token = request_token(request.get_json(silent=True) or {}, request.headers)
+    if token:
+        revoke(token)
+    return jsonify({"status": "signed out"})
 
 @app.route("/api/validate", methods=["POST"])
 def validate_and_mint():
     form, files = request.form, request.files
-    for f in ("barcode_id","pubkey","password"):
+    # A session token from /signin replaces the password and skips the wallet lookups
+    token = request_token(form, request.headers)
+    for f in ("barcode_id","pubkey") if token else ("barcode_id","pubkey","password"):
         if f not in form:
             return jsonify({"error":f"Missing {f}"}),400
     if "image" not in files:
         return jsonify({"error":"Missing image"}),400
 
-    b, pk, pw = form["barcode_id"], form["pubkey"], form["password"]
-    if not wallet_exists(pk):
+    b, pk = form["barcode_id"], form["pubkey"]
+    if token:
+        if not check_token(token,pk):
+            return jsonify({"error":"invalid or expired token"}),401
+    elif not wallet_exists(pk):
         return jsonify({"error":"wallet not found"}),404
-    if not verify_password(pk,pw):
+    elif not verify_password(pk,form["password"]):
         return jsonify({"error":"invalid credentials"}),403
 
     product = fetch_product(b)
     if not product:
         return jsonify({"error":"invalid barcode"}),400
 
-    image_hash    = hashlib.sha256(files["image"].read()).hexdigest()
+    image_hash    = sha256_of(files["image"])
+    phash, seen = photos.claim_upload(files["image"], image_hash)
+    if phash is None:
+        return jsonify({"error": "image could not be decoded"}), 400
+    if seen:
+        return jsonify({"error": "similar image already submitted", "similar_to": seen[0]}), 409
+
     score         = product.get("ecoscore_data",{}).get("adjustments",{}).get("packaging",{}).get("value",0)
     tokens        = map_score_to_tokens(score)
     submission_id = hashlib.sha256(f"{b}|{image_hash}|{datetime.utcnow().isoformat()}".encode()).hexdigest()
 
-    mint_tx    = mint_spl_token(pk, tokens)
+    with photos.held(image_hash):
+        mint_tx    = mint_spl_token(pk, tokens)
     spl_bal    = get_spl_balance(pk)
 
     return jsonify({
@@ -100,7 +114,7 @@ def wallet_info(pubkey):
     if not wallet_exists(pubkey):
         return jsonify({"error":"wallet not found"}),404
     info    = get_wallet_info(pubkey)
-    spl_bal = get_spl_balance(pubkey)
+    spl_bal = get_spl_balance(pubkey, fresh=request.args.get("fresh") == "1")
     return jsonify({"wallet_info":info,"spl_balance":spl_bal})
 
 if __name__=="__main__":
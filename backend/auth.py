@@ -0,0 +1,170 @@
+"""
+auth.py
+
+Password hashing and sessions shared by the wallet managers.
+
+  • Passwords are hashed with salted scrypt ("scrypt$n$r$p$salt$hash"). The cost
+    is tunable through AUTH_SCRYPT_N / AUTH_SCRYPT_R / AUTH_SCRYPT_P.
+  • Legacy unsalted SHA-256 hex digests are still accepted and are rehashed the
+    first time the password is verified. So is any hash whose scrypt cost
+    differs from the current setting.
+  • The KDF runs on a small dedicated pool (AUTH_KDF_WORKERS). A burst of
+    sign-ins therefore queues there instead of tying up every web worker's CPU
+    and scrypt memory at once.
+  • After a successful sign-in the client gets a signed session token valid
+    for AUTH_TOKEN_TTL seconds. Presenting it skips the KDF entirely. Set
+    AUTH_SECRET so tokens survive restarts and are accepted by every server
+    process.
+  • Tokens are checked in-process with no database round-trip. /signout adds
+    a correctly signed token to a revocation set, where it stays until the
+    token expires. The set never evicts a live revocation. When it holds
+    AUTH_REVOKED_MAX of them, a further signout fails closed: every token
+    expiring no later than the signed-out one is rejected, and their owners
+    sign in with their password again. The set is local to the process, so a
+    short AUTH_TOKEN_TTL bounds how long a revoked token lives elsewhere.
+"""
+
+import asyncio
+import base64
+import hashlib
+import hmac
+import os
+import secrets
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+SCRYPT_N = int(os.environ.get("AUTH_SCRYPT_N", 2 ** 14))
+SCRYPT_R = int(os.environ.get("AUTH_SCRYPT_R", 8))
+SCRYPT_P = int(os.environ.get("AUTH_SCRYPT_P", 1))
+KDF_WORKERS = int(os.environ.get("AUTH_KDF_WORKERS", 4))
+TOKEN_TTL = int(os.environ.get("AUTH_TOKEN_TTL", 900))
+# Without AUTH_SECRET, tokens only work against the process that issued them.
+SECRET = os.environ.get("AUTH_SECRET", "").encode() or secrets.token_bytes(32)
+
+REVOKED_MAX = int(os.environ.get("AUTH_REVOKED_MAX", 10_000))
+
+_kdf_pool = ThreadPoolExecutor(max_workers=KDF_WORKERS, thread_name_prefix="kdf")
+_revoked = {}  # decoded token mac -> expiry
+_revoked_lock = threading.Lock()
+_reject_through = 0  # tokens expiring at or before this are rejected (revocation set overflowed)
+
+def _b64(raw: bytes) -> str:
+    return base64.urlsafe_b64encode(raw).rstrip(b"=").decode()
+
+def _unb64(text: str) -> bytes:
+    return base64.urlsafe_b64decode(text + "=" * (-len(text) % 4))
+
+def _token_mac(mac: str) -> bytes:
+    """Decode a token's MAC, rejecting any encoding other than the one issue_token() produces."""
+    raw = _unb64(mac)
+    if _b64(raw) != mac:
+        raise ValueError("non-canonical token encoding")
+    return raw
+
+def _scrypt(password: str, salt: bytes, n: int, r: int, p: int) -> bytes:
+    # hashlib.scrypt releases the GIL, so the pool threads run in parallel
+    return hashlib.scrypt(password.encode(), salt=salt, n=n, r=r, p=p,
+                          maxmem=128 * n * r * p + 2 ** 20, dklen=32)
+
+def make_hash(password: str) -> str:
+    salt = secrets.token_bytes(16)
+    digest = _scrypt(password, salt, SCRYPT_N, SCRYPT_R, SCRYPT_P)
+    return f"scrypt${SCRYPT_N}${SCRYPT_R}${SCRYPT_P}${_b64(salt)}${_b64(digest)}"
+
+def check_hash(stored: str, password: str):
+    """Returns (matches, needs_rehash) for a stored hash of either format."""
+    if not stored:
+        return False, False
+    if stored.startswith("scrypt$"):
+        _, n, r, p, salt, digest = stored.split("$")
+        n, r, p = int(n), int(r), int(p)
+        ok = hmac.compare_digest(_scrypt(password, _unb64(salt), n, r, p), _unb64(digest))
+        return ok, ok and (n, r, p) != (SCRYPT_N, SCRYPT_R, SCRYPT_P)
+    legacy = hashlib.sha256(password.encode()).hexdigest()
+    ok = hmac.compare_digest(legacy, stored)
+    return ok, ok
+
+def hash_password(password: str) -> str:
+    return _kdf_pool.submit(make_hash, password).result()
+
+def check_password(stored: str, password: str):
+    """check_hash() on the KDF pool."""
+    return _kdf_pool.submit(check_hash, stored, password).result()
+
+async def hash_password_async(password: str) -> str:
+    return await asyncio.wrap_future(_kdf_pool.submit(make_hash, password))
+
+async def check_hash_async(stored: str, password: str):
+    return await asyncio.wrap_future(_kdf_pool.submit(check_hash, stored, password))
+
+def verify(col, pubkey: str, password: str) -> bool:
+    """Check `password` against the wallet in Mongo collection `col`, upgrading its hash if needed."""
+    doc = col.find_one({"_id": pubkey}, {"password_hash": 1})
+    if not doc:
+        return False
+    return verify_stored(col, pubkey, doc.get("password_hash"), password)
+
+def verify_stored(col, pubkey: str, stored: str, password: str) -> bool:
+    """verify() for a password hash the caller has already read."""
+    ok, rehash = check_password(stored, password)
+    if rehash:
+        # Only replace the hash that was verified, in case it changed meanwhile.
+        col.update_one({"_id": pubkey, "password_hash": stored},
+                       {"$set": {"password_hash": hash_password(password)}})
+    return ok
+
+def _signed(token: str):
+    """(owner, expiry, decoded mac) of a token carrying a valid signature, else None."""
+    try:
+        owner, expiry, mac = token.split(".")
+        raw = _token_mac(mac)
+        expiry = int(expiry)
+    except (ValueError, AttributeError):
+        return None
+    expected = hmac.new(SECRET, f"{owner}.{expiry}".encode(), hashlib.sha256).digest()
+    return (owner, expiry, raw) if hmac.compare_digest(raw, expected) else None
+
+def revoke(token: str):
+    """Reject `token` in this process until it would have expired anyway."""
+    global _reject_through
+    signed = _signed(token)
+    if signed is None:
+        return  # forged or malformed: nothing to revoke
+    _, expiry, raw = signed
+    now = time.time()
+    if expiry <= now:
+        return
+    with _revoked_lock:
+        if raw not in _revoked and len(_revoked) >= REVOKED_MAX:
+            for key in [k for k, exp in _revoked.items() if exp <= now]:
+                del _revoked[key]
+        if raw in _revoked or len(_revoked) < REVOKED_MAX:
+            _revoked[raw] = expiry
+        else:
+            # Full of live revocations: fail closed rather than evict one
+            _reject_through = max(_reject_through, expiry)
+
+def issue_token(pubkey: str, ttl: int = TOKEN_TTL) -> str:
+    """Signed "<pubkey>.<expiry>.<mac>" session token."""
+    body = f"{pubkey}.{int(time.time()) + ttl}"
+    mac = hmac.new(SECRET, body.encode(), hashlib.sha256).digest()
+    return f"{body}.{_b64(mac)}"
+
+def check_token(token: str, pubkey: str) -> bool:
+    signed = _signed(token)
+    if signed is None:
+        return False
+    owner, expiry, raw = signed
+    return (owner == pubkey and expiry > time.time()
+            and expiry > _reject_through and raw not in _revoked)
+
+def bearer_token(header: str):
+    """Token from an "Authorization: Bearer <token>" header, if any."""
+    if header and header.startswith("Bearer "):
+        return header[len("Bearer "):].strip()
+    return None
+
+def request_token(data, headers):
+    """Session token sent as a "token" field (JSON or form) or as a bearer header."""
+    return data.get("token") or bearer_token(headers.get("Authorization"))
@@ -0,0 +1,62 @@
+"""
+authority.py
+
+In-memory mint authority signers. Each token module registers how to load the
+authority for its mint(s); the keypair is loaded once, on first use, and then
+served from memory until it is explicitly reloaded or rotated.
+"""
+
+import json
+import threading
+
+from solders.keypair import Keypair
+
+def keypair_from_file(path: str):
+    """Loader reading a Solana CLI style keypair file (JSON list of 64 bytes)."""
+    def load() -> Keypair:
+        with open(path, "r") as f:
+            secret = json.load(f)
+        return Keypair.from_bytes(bytes(secret))
+    return load
+
+class SignerProvider:
+    def __init__(self):
+        self._loaders = {}
+        self._signers = {}
+        self._lock = threading.Lock()
+
+    def register(self, mint_address: str, loader):
+        """Set the loader used for `mint_address`; any cached signer is dropped."""
+        with self._lock:
+            self._loaders[mint_address] = loader
+            self._signers.pop(mint_address, None)
+
+    def get(self, mint_address: str) -> Keypair:
+        signer = self._signers.get(mint_address)
+        if signer is not None:
+            return signer
+        with self._lock:
+            signer = self._signers.get(mint_address)
+            if signer is None:
+                loader = self._loaders.get(mint_address)
+                if loader is None:
+                    raise KeyError(f"No mint authority registered for {mint_address}")
+                signer = self._signers[mint_address] = loader()
+            return signer
+
+    def reload(self, mint_address: str = None):
+        """Re-run the loader for one mint (or all of them) and swap the new signer in."""
+        with self._lock:
+            mints = [mint_address] if mint_address else list(self._loaders)
+            loaded = {m: self._loaders[m]() for m in mints}
+            self._signers.update(loaded)
+
+    def rotate(self, mint_address: str, keypair: Keypair):
+        """Replace the signer for `mint_address` without touching the key store."""
+        with self._lock:
+            self._signers[mint_address] = keypair
+
+    def loaded(self) -> dict:
+        return {mint: str(kp.pubkey()) for mint, kp in self._signers.items()}
+
+signers = SignerProvider()
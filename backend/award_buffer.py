@@ -0,0 +1,142 @@
+"""
+award_buffer.py
+
+Coalesces point awards from concurrent /api/validate requests. An award
+waits up to POINTS_FLUSH_MS milliseconds, or until POINTS_FLUSH_SIZE awards
+are queued. The batch is then written to the points ledger with one
+insert_many, and one aggregate gives each caller its own post-award total.
+
+POINTS_DURABILITY selects the write concern a flush waits for:
+  ack       acknowledged by the primary (default)
+  journal   written to the primary's on-disk journal
+  majority  replicated to a majority of the replica set and journaled
+"""
+
+import os
+import threading
+import time
+from concurrent.futures import Future
+from datetime import datetime
+
+from pymongo.errors import BulkWriteError
+from pymongo.write_concern import WriteConcern
+
+from points_ledger import current_epoch, ledger
+
+POINTS_FLUSH_MS    = float(os.environ.get("POINTS_FLUSH_MS", 5))
+POINTS_FLUSH_SIZE  = int(os.environ.get("POINTS_FLUSH_SIZE", 500))
+POINTS_DURABILITY  = os.environ.get("POINTS_DURABILITY", "ack")
+AWARD_TIMEOUT      = 10.0
+
+WRITE_CONCERNS = {
+    "ack": WriteConcern(w=1),
+    "journal": WriteConcern(w=1, j=True),
+    "majority": WriteConcern(w="majority", j=True),
+}
+
+class AwardBuffer:
+    """Buffers ledger entries and flushes them from one background thread."""
+
+    def __init__(self, flush_ms: float = POINTS_FLUSH_MS, max_batch: int = POINTS_FLUSH_SIZE,
+                 durability: str = POINTS_DURABILITY):
+        if durability not in WRITE_CONCERNS:
+            raise ValueError(f"unknown durability mode: {durability!r}")
+        self.flush_interval = flush_ms / 1000
+        self.max_batch = max_batch
+        self.durability = durability
+        self._ledger = ledger.with_options(write_concern=WRITE_CONCERNS[durability])
+        self._pending = []  # [(entry, future, queued_at)]
+        self._cond = threading.Condition()
+        self._thread = None
+        self._batches = 0
+        self._awards = 0
+
+    def award(self, pubkey: str, delta: int, submission_id: str = None) -> int:
+        """
+        Record `delta` points for `pubkey` in the open epoch and return its new
+        total. A TimeoutError after AWARD_TIMEOUT does not mean the entry was
+        dropped: it stays queued and may still be written.
+        """
+        entry = {"pubkey": pubkey, "epoch": current_epoch(), "delta": delta,
+                 "created_at": datetime.utcnow()}
+        if submission_id:
+            entry["_id"] = submission_id
+        fut = Future()
+        with self._cond:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="award-buffer", daemon=True)
+                self._thread.start()
+            self._pending.append((entry, fut, time.monotonic()))
+            if len(self._pending) == 1 or len(self._pending) >= self.max_batch:
+                self._cond.notify()
+        return fut.result(timeout=AWARD_TIMEOUT)
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while not self._pending:
+                    self._cond.wait()
+                deadline = self._pending[0][2] + self.flush_interval
+                while len(self._pending) < self.max_batch:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    self._cond.wait(remaining)
+                batch = self._pending[:self.max_batch]
+                self._pending = self._pending[self.max_batch:]
+            try:
+                self._flush(batch)
+            except Exception as e:
+                for _, fut, _ in batch:
+                    if not fut.done():
+                        fut.set_exception(e)
+
+    def _flush(self, batch: list):
+        entries = [entry for entry, _, _ in batch]
+        failed = {}    # index -> error
+        duplicate = set()
+        try:
+            self._ledger.insert_many(entries, ordered=False)
+        except BulkWriteError as e:
+            for err in e.details["writeErrors"]:
+                if err["code"] == 11000:
+                    duplicate.add(err["index"])  # submission already recorded
+                else:
+                    failed[err["index"]] = err["errmsg"]
+        self._batches += 1
+        self._awards += len(entries)
+
+        keys = {(e["pubkey"], e["epoch"]) for e in entries}
+        rows = ledger.aggregate([
+            {"$match": {"pubkey": {"$in": [pk for pk, _ in keys]},
+                        "epoch": {"$in": list({ep for _, ep in keys})}}},
+            {"$group": {"_id": {"pubkey": "$pubkey", "epoch": "$epoch"}, "points": {"$sum": "$delta"}}},
+        ])
+        running = {(r["_id"]["pubkey"], r["_id"]["epoch"]): r["points"] for r in rows}
+
+        # Walk back from the batch total so a pubkey awarded twice in one
+        # batch sees its first award's total, then its second's.
+        for i in range(len(batch) - 1, -1, -1):
+            entry, fut, _ = batch[i]
+            if i in failed:
+                fut.set_exception(RuntimeError(failed[i]))
+                continue
+            key = (entry["pubkey"], entry["epoch"])
+            fut.set_result(running.get(key, 0))
+            if i not in duplicate:
+                running[key] = running.get(key, 0) - entry["delta"]
+
+    def stats(self) -> dict:
+        with self._cond:
+            queued = len(self._pending)
+        return {
+            "durability": self.durability,
+            "flush_ms": self.flush_interval * 1000,
+            "max_batch": self.max_batch,
+            "batches": self._batches,
+            "awards": self._awards,
+            "awards_per_batch": round(self._awards / self._batches, 2) if self._batches else 0.0,
+            "queued": queued,
+        }
+
+awards = AwardBuffer()
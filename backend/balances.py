@@ -0,0 +1,115 @@
+"""
+balances.py
+
+SPL token balance lookups that cost one RPC round-trip per call instead of one
+per token account:
+  • get_owner_balance  — all of an owner's accounts for a mint via a single
+                         jsonParsed getTokenAccountsByOwner
+  • get_owner_balances — many owners at once via getMultipleAccounts on their
+                         associated token accounts (ATAs), 100 per request
+
+Single-owner balances are cached per (owner, mint) for BALANCE_CACHE_TTL
+seconds; anything that mints to or airdrops to an owner calls invalidate().
+"""
+
+import os
+import threading
+
+from solana.rpc.types import DataSliceOpts, TokenAccountOpts
+from solders.pubkey import Pubkey
+from spl.token.instructions import get_associated_token_address
+
+from rpc_pool import DEFAULT_RPC, get_client
+from ttl_cache import TTLCache, MISSING
+
+BALANCE_CACHE_TTL  = float(os.environ.get("BALANCE_CACHE_TTL", 15))
+BALANCE_CACHE_SIZE = int(os.environ.get("BALANCE_CACHE_SIZE", 50_000))
+
+MULTIPLE_ACCOUNTS_LIMIT = 100
+
+# SPL token account layout: mint (32) | owner (32) | amount (u64 LE) | ...
+AMOUNT_OFFSET = 64
+AMOUNT_SLICE = DataSliceOpts(offset=AMOUNT_OFFSET, length=8)
+
+_cache = TTLCache(max_size=BALANCE_CACHE_SIZE, ttl=BALANCE_CACHE_TTL)
+_mints = set()
+_generations = {}  # (owner, mint) -> bumped on every invalidation
+_lock = threading.Lock()
+
+def invalidate(pubkey_str: str, mint_address: str = None):
+    """Drop cached balances of `pubkey_str` for one mint, or for every mint seen so far."""
+    with _lock:
+        mints = [mint_address] if mint_address else list(_mints)
+        for mint in mints:
+            key = (pubkey_str, mint)
+            _generations[key] = _generations.get(key, 0) + 1
+            _cache.pop(key)
+
+def balance_cache_stats() -> dict:
+    return _cache.stats()
+
+def get_owner_balance(pubkey_str: str, mint_address: str, endpoint: str = DEFAULT_RPC,
+                      fresh: bool = False) -> int:
+    """
+    Total balance of `mint_address` over every token account owned by `pubkey_str`.
+    Served from the cache unless `fresh` is set.
+    """
+    key = (pubkey_str, mint_address)
+    cached, generation = _check_cache(key, fresh)
+    if cached is not MISSING:
+        return cached
+    resp = get_client(endpoint).get_token_accounts_by_owner_json_parsed(
+        Pubkey.from_string(pubkey_str),
+        TokenAccountOpts(mint=Pubkey.from_string(mint_address))
+    )
+    return _store(key, generation, _sum_parsed(resp))
+
+async def get_owner_balance_async(pubkey_str: str, mint_address: str, client, fresh: bool = False) -> int:
+    """get_owner_balance for a solana.rpc.async_api.AsyncClient; shares the same cache."""
+    key = (pubkey_str, mint_address)
+    cached, generation = _check_cache(key, fresh)
+    if cached is not MISSING:
+        return cached
+    resp = await client.get_token_accounts_by_owner_json_parsed(
+        Pubkey.from_string(pubkey_str),
+        TokenAccountOpts(mint=Pubkey.from_string(mint_address))
+    )
+    return _store(key, generation, _sum_parsed(resp))
+
+def _check_cache(key, fresh: bool):
+    if not fresh:
+        cached = _cache.get(key, MISSING)
+        if cached is not MISSING:
+            return cached, None
+    with _lock:
+        _mints.add(key[1])
+        return MISSING, _generations.get(key, 0)
+
+def _store(key, generation: int, total: int) -> int:
+    with _lock:
+        # A mint that landed while we were reading invalidated this value already.
+        if _generations.get(key, 0) == generation:
+            _cache.set(key, total)
+    return total
+
+def _sum_parsed(resp) -> int:
+    total = 0
+    for acct in resp.value:
+        total += int(acct.account.data.parsed["info"]["tokenAmount"]["amount"])
+    return total
+
+def get_owner_balances(pubkeys: list, mint_address: str, endpoint: str = DEFAULT_RPC) -> dict:
+    """
+    Balance of `mint_address` in each owner's associated token account.
+    Owners without an ATA map to 0; tokens held in other accounts are not counted.
+    """
+    client = get_client(endpoint)
+    mint = Pubkey.from_string(mint_address)
+    balances = {}
+    for i in range(0, len(pubkeys), MULTIPLE_ACCOUNTS_LIMIT):
+        chunk = pubkeys[i:i + MULTIPLE_ACCOUNTS_LIMIT]
+        atas = [get_associated_token_address(Pubkey.from_string(pk), mint) for pk in chunk]
+        resp = client.get_multiple_accounts(atas, data_slice=AMOUNT_SLICE)
+        for pk, acct in zip(chunk, resp.value):
+            balances[pk] = int.from_bytes(bytes(acct.data), "little") if acct else 0
+    return balances
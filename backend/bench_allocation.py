@@ -0,0 +1,109 @@
+#!/usr/bin/env python3
+"""
+bench_allocation.py
+
+Times the reward splits on synthetic holders:
+
+  dict-float    the float split /distribute used to run (raw/floor dicts, full sort)
+  round-robin   serverVoting's old leftover loop
+  dict-exact    integer largest remainder over dicts in pure Python
+  numpy         allocation.split on an int64 points array
+  numpy-dict    allocation.split_dict (dict in, dict out)
+
+    python bench_allocation.py                      # 10^6 holders
+    python bench_allocation.py --holders 100000 --repeat 5
+"""
+
+import argparse
+import random
+import time
+import tracemalloc
+
+import numpy as np
+
+from allocation import split, split_dict
+
+LAMPORTS_PER_SOL = 1_000_000_000
+
+def dict_float(pts_map: dict, total: int) -> dict:
+    total_pts = sum(pts_map.values())
+    raw = {pk: (pts / total_pts) * total for pk, pts in pts_map.items()}
+    floor = {pk: int(raw[pk]) for pk in raw}
+    remainder = total - sum(floor.values())
+    fracs = sorted(raw.items(), key=lambda kv: raw[kv[0]] - floor[kv[0]], reverse=True)
+    for pk, _ in fracs[:remainder]:
+        floor[pk] += 1
+    return floor
+
+def round_robin(holders: dict, total: int) -> dict:
+    total_votes = sum(holders.values())
+    distribution = {}
+    tokens_left = total
+    for owner, votes in holders.items():
+        amt = (votes * total) // total_votes
+        distribution[owner] = amt
+        tokens_left -= amt
+    sorted_holders = sorted(holders.items(), key=lambda x: x[1], reverse=True)
+    idx = 0
+    while tokens_left > 0:
+        distribution[sorted_holders[idx % len(sorted_holders)][0]] += 1
+        tokens_left -= 1
+        idx += 1
+    return distribution
+
+def dict_exact(points: dict, total: int) -> dict:
+    total_pts = sum(points.values())
+    shares, remainders = {}, []
+    for pk, pts in points.items():
+        share, rem = divmod(pts * total, total_pts)
+        shares[pk] = share
+        remainders.append((-rem, pk))
+    for _, pk in sorted(remainders)[:total - sum(shares.values())]:
+        shares[pk] += 1
+    return shares
+
+def measure(fn, repeat: int):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    tracemalloc.start()
+    fn()
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return best, peak
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark reward allocation")
+    parser.add_argument("--holders", type=int, default=1_000_000)
+    parser.add_argument("--total-sol", type=int, default=100)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    points = {f"{i:044d}": rng.randint(1, 500) for i in range(args.holders)}
+    column = np.fromiter(points.values(), dtype=np.int64, count=len(points))
+    lamports = args.total_sol * LAMPORTS_PER_SOL
+
+    cases = [
+        ("dict-float",  "SOL",      lambda: dict_float(points, args.total_sol)),
+        ("round-robin", "SOL",      lambda: round_robin(points, args.total_sol)),
+        ("dict-exact",  "SOL",      lambda: dict_exact(points, args.total_sol)),
+        ("dict-exact",  "lamports", lambda: dict_exact(points, lamports)),
+        ("numpy",       "SOL",      lambda: split(column, args.total_sol)),
+        ("numpy",       "lamports", lambda: split(column, lamports)),
+        ("numpy",       "quadratic", lambda: split(column, lamports, "quadratic")),
+        ("numpy-dict",  "lamports", lambda: split_dict(points, lamports)),
+    ]
+    print(f"{args.holders:,} holders, {args.total_sol} SOL, best of {args.repeat}")
+    print(f"{'engine':<12} {'units':<10} {'seconds':>9} {'peak MiB':>9}")
+    for name, units, fn in cases:
+        seconds, peak = measure(fn, args.repeat)
+        print(f"{name:<12} {units:<10} {seconds:>9.3f} {peak / 2**20:>9.1f}")
+
+    assert split_dict(points, lamports) == dict_exact(points, lamports)
+
+if __name__ == "__main__":
+    main()
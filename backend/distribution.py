@@ -0,0 +1,136 @@
+"""
+distribution.py
+
+Payout engine behind /distribute. The allocation is computed once, then the
+sends fan out over a bounded worker pool that respects an RPC rate limit and
+retries with exponential backoff. Signatures are confirmed in batches with
+getSignatureStatuses. Results are yielded as they happen, so callers can
+stream them or record them instead of building one large response.
+"""
+
+import os
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from solders.pubkey import Pubkey
+from solders.signature import Signature
+from solders.transaction_status import TransactionConfirmationStatus
+
+from allocation import split_dict
+
+LAMPORTS_PER_SOL = 1_000_000_000
+
+DISTRIBUTE_WORKERS = int(os.environ.get("DISTRIBUTE_WORKERS", 16))
+DISTRIBUTE_RPS     = float(os.environ.get("DISTRIBUTE_RPS", 40))
+DISTRIBUTE_RETRIES = int(os.environ.get("DISTRIBUTE_RETRIES", 3))
+DISTRIBUTE_BACKOFF = float(os.environ.get("DISTRIBUTE_BACKOFF", 0.5))
+CONFIRM_TIMEOUT    = float(os.environ.get("CONFIRM_TIMEOUT", 60))
+CONFIRM_INTERVAL   = 0.5
+STATUS_BATCH_SIZE  = 256  # getSignatureStatuses limit
+CONFIRMED = (TransactionConfirmationStatus.Confirmed, TransactionConfirmationStatus.Finalized)
+
+def allocate(points: dict, total: int, policy: str = "proportional", **params) -> dict:
+    """
+    Split `total` units over {pubkey: points} in exact integers (see
+    allocation.py). Ties go to the lexicographically smaller pubkey.
+    """
+    return split_dict(points, total, policy, **params)
+
+class RateLimiter:
+    """Token bucket shared by the worker threads: at most `rate` calls per second."""
+
+    def __init__(self, rate: float, burst: int = None):
+        self.rate = rate
+        self.capacity = burst or max(1, int(rate))
+        self._tokens = float(self.capacity)
+        self._last = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._last) * self.rate)
+                self._last = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                wait = (1 - self._tokens) / self.rate
+            time.sleep(wait)
+
+def with_retries(fn, limiter: RateLimiter, retries: int = DISTRIBUTE_RETRIES,
+                 backoff: float = DISTRIBUTE_BACKOFF):
+    """Call fn() under the rate limit, retrying failures with jittered exponential backoff."""
+    for attempt in range(retries + 1):
+        limiter.acquire()
+        try:
+            return fn()
+        except Exception:
+            if attempt == retries:
+                raise
+            time.sleep(backoff * (2 ** attempt) * (1 + random.random()))
+
+def airdrop_sender(client):
+    """Sender that airdrops `lamports` SOL to an owner and returns the signature."""
+    def send(pubkey_str: str, lamports: int) -> str:
+        resp = client.request_airdrop(Pubkey.from_string(pubkey_str), lamports)
+        return str(resp.value)
+    return send
+
+def send_all(allocations: dict, send, workers: int = DISTRIBUTE_WORKERS, rate: float = DISTRIBUTE_RPS):
+    """
+    Run send(pubkey, amount) for every positive allocation on a bounded pool.
+    Yields {"pubkey", "amount", "status": "sent"|"failed", "signature"|"error"}
+    in completion order.
+    """
+    limiter = RateLimiter(rate)
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="distribute") as pool:
+        futures = {
+            pool.submit(with_retries, lambda pk=pk, amt=amt: send(pk, amt), limiter): (pk, amt)
+            for pk, amt in allocations.items() if amt > 0
+        }
+        for fut in as_completed(futures):
+            pk, amt = futures[fut]
+            try:
+                yield {"pubkey": pk, "amount": amt, "status": "sent", "signature": fut.result()}
+            except Exception as e:
+                yield {"pubkey": pk, "amount": amt, "status": "failed", "error": str(e)}
+
+def confirm_all(client, signatures: dict, timeout: float = CONFIRM_TIMEOUT):
+    """
+    Poll getSignatureStatuses for {pubkey: signature} in batches of 256 until
+    every signature is confirmed, failed or `timeout` elapses. Yields
+    {"pubkey", "signature", "status": "confirmed"|"failed"|"unconfirmed"}.
+    """
+    pending = dict(signatures)
+    deadline = time.monotonic() + timeout
+    while pending:
+        items = list(pending.items())
+        for i in range(0, len(items), STATUS_BATCH_SIZE):
+            batch = items[i:i + STATUS_BATCH_SIZE]
+            resp = client.get_signature_statuses([Signature.from_string(sig) for _, sig in batch])
+            for (pk, sig), status in zip(batch, resp.value):
+                if status is None or status.confirmation_status is None:
+                    continue
+                if status.err is not None:
+                    del pending[pk]
+                    yield {"pubkey": pk, "signature": sig, "status": "failed", "error": str(status.err)}
+                elif status.confirmation_status in CONFIRMED:
+                    del pending[pk]
+                    yield {"pubkey": pk, "signature": sig, "status": "confirmed"}
+        if not pending or time.monotonic() >= deadline:
+            break
+        time.sleep(CONFIRM_INTERVAL)
+    for pk, sig in pending.items():
+        yield {"pubkey": pk, "signature": sig, "status": "unconfirmed"}
+
+def run(client, allocations: dict, send, **kwargs):
+    """send_all() followed by confirm_all() over the signatures that were sent."""
+    sent = {}
+    for result in send_all(allocations, send, **kwargs):
+        if result["status"] == "sent":
+            sent[result["pubkey"]] = result["signature"]
+        yield result
+    yield from confirm_all(client, sent)
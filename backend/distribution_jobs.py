@@ -0,0 +1,245 @@
+"""
+distribution_jobs.py
+
+Background payout jobs for /distribute. The web tier only closes the points
+epoch and records a job. A worker (distribution_worker.py) snapshots the
+epoch's points, sends the airdrops and confirms them. Every step is recorded
+in MongoDB, so a restarted worker resumes where the previous one stopped.
+
+Job status:       queued → snapshotted → running → completed
+                  (or failed, when its allocation policy rejects the snapshot;
+                  delete the job to queue its epoch again)
+Recipient state:  pending → sending → sent → confirmed
+                  (or skipped / failed / unconfirmed)
+
+One job exists per points epoch (see points_ledger.py). Its id is the
+idempotency key, so requesting the same epoch twice returns the existing job
+instead of paying out again.
+"""
+
+import json
+import os
+import uuid
+from datetime import datetime, timedelta
+
+import numpy as np
+from pymongo import MongoClient, ReturnDocument, UpdateOne
+from pymongo.errors import DuplicateKeyError
+
+import distribution
+from allocation import split
+from distribution import LAMPORTS_PER_SOL, airdrop_sender
+from points_ledger import compact, iter_epoch_totals
+
+JOB_LEASE       = timedelta(seconds=int(os.environ.get("DISTRIBUTION_JOB_LEASE", 120)))
+BATCH_SIZE      = int(os.environ.get("DISTRIBUTION_BATCH_SIZE", 500))
+
+# Allocation policy for new jobs (see allocation.py), e.g.
+# DISTRIBUTION_POLICY=capped DISTRIBUTION_POLICY_PARAMS='{"cap": 5000000000}'
+DISTRIBUTION_POLICY        = os.environ.get("DISTRIBUTION_POLICY", "proportional")
+DISTRIBUTION_POLICY_PARAMS = json.loads(os.environ.get("DISTRIBUTION_POLICY_PARAMS", "{}"))
+
+client     = MongoClient("mongodb://localhost:27017/")
+db         = client["sasehacks"]
+jobs       = db["distribution_jobs"]
+recipients = db["distribution_recipients"]
+
+_indexes_ready = False
+
+def _ensure_indexes():
+    global _indexes_ready
+    if not _indexes_ready:
+        recipients.create_index([("job_id", 1), ("state", 1)])
+        jobs.create_index([("status", 1), ("created_at", 1)])
+        _indexes_ready = True
+
+def check_policy(total_sol: int, policy: str = DISTRIBUTION_POLICY, policy_params: dict = None):
+    """
+    Raise ValueError unless `policy` with `policy_params` can split `total_sol`.
+    A dry run for a single holder catches unknown policies, missing or unknown
+    params and a `floor` minimum above the total before an epoch is closed.
+    """
+    params = DISTRIBUTION_POLICY_PARAMS if policy_params is None else policy_params
+    if not isinstance(params, dict):
+        raise ValueError("allocation policy params must be an object")
+    try:
+        split([1], total_sol * LAMPORTS_PER_SOL, policy, **params)
+    except TypeError as e:
+        raise ValueError(f"invalid params for allocation policy {policy!r}: {e}") from e
+
+def create_job(total_sol: int, epoch: int, policy: str = DISTRIBUTION_POLICY,
+               policy_params: dict = None):
+    """Queue the payout for a closed points epoch. Returns (job, created)."""
+    _ensure_indexes()
+    check_policy(total_sol, policy, policy_params)
+    now = datetime.utcnow()
+    job = {
+        "_id": f"airdrop-{epoch}",
+        "epoch": epoch,
+        "total_sol": total_sol,
+        "policy": policy,
+        "policy_params": DISTRIBUTION_POLICY_PARAMS if policy_params is None else policy_params,
+        "status": "queued",
+        "created_at": now,
+        "updated_at": now,
+        "worker": None,
+        "lease_until": None,
+    }
+    try:
+        jobs.insert_one(job)
+        return job, True
+    except DuplicateKeyError:
+        return jobs.find_one({"_id": job["_id"]}), False
+
+def job_progress(job_id: str):
+    job = jobs.find_one({"_id": job_id}, {"worker": 0, "lease_until": 0})
+    if job is None:
+        return None
+    states = recipients.aggregate([
+        {"$match": {"job_id": job_id}},
+        {"$group": {"_id": "$state", "n": {"$sum": 1}}},
+    ])
+    job["job_id"] = job.pop("_id")
+    job["recipients_by_state"] = {s["_id"]: s["n"] for s in states}
+    return job
+
+# ---------------------------------------------------------------- worker side
+
+def claim_job(worker_id: str):
+    """Lease the oldest unfinished job that no live worker holds."""
+    _ensure_indexes()
+    now = datetime.utcnow()
+    return jobs.find_one_and_update(
+        {
+            "status": {"$in": ["queued", "snapshotted", "running"]},
+            "$or": [{"lease_until": None}, {"lease_until": {"$lt": now}}],
+        },
+        {"$set": {"worker": worker_id, "lease_until": now + JOB_LEASE}},
+        sort=[("created_at", 1)],
+        return_document=ReturnDocument.AFTER
+    )
+
+def _update_job(job: dict, fields: dict):
+    now = datetime.utcnow()
+    res = jobs.update_one(
+        {"_id": job["_id"], "worker": job["worker"]},
+        {"$set": {**fields, "updated_at": now, "lease_until": now + JOB_LEASE}}
+    )
+    if res.matched_count == 0:
+        raise RuntimeError(f"lost the lease on {job['_id']}")
+    job.update(fields)
+
+def _job_recipients(job_id: str, projection: dict):
+    # Walk the _id index: unlike (job_id, state) it does not move under the state updates.
+    return recipients.find(
+        {"_id": {"$gte": f"{job_id}:", "$lt": f"{job_id};"}}, projection
+    ).hint([("_id", 1)]).batch_size(BATCH_SIZE)
+
+def snapshot(job: dict):
+    """
+    Copy the compacted points of the job's epoch into recipient documents,
+    then give each its share in lamports under the job's allocation policy.
+    Totals stream in batches; only the points column is held in memory.
+    """
+    # A previous worker may have died half way through; its partial snapshot is redone.
+    recipients.delete_many({"job_id": job["_id"]})
+    compact(job["epoch"])
+    batch = []
+    for pk, pts in iter_epoch_totals(job["epoch"], BATCH_SIZE):
+        batch.append({
+            "_id": f"{job['_id']}:{pk}",
+            "job_id": job["_id"],
+            "pubkey": pk,
+            "points": pts,
+            "sol": 0,
+            "lamports": 0,
+            "state": "skipped",
+        })
+        if len(batch) >= BATCH_SIZE:
+            recipients.insert_many(batch, ordered=False)
+            batch = []
+    if batch:
+        recipients.insert_many(batch, ordered=False)
+
+    # Points are read into one int64 array in _id (= pubkey) order, which is
+    # also the tie-break order; a second pass in the same order writes the shares.
+    points = np.fromiter((r["points"] for r in _job_recipients(job["_id"], {"points": 1})),
+                         dtype=np.int64)
+    try:
+        lamports = split(points, job["total_sol"] * LAMPORTS_PER_SOL,
+                         job.get("policy", "proportional"), **job.get("policy_params", {}))
+    except (TypeError, ValueError) as e:
+        # e.g. a floor minimum too large for this many holders: every retry would fail the same way
+        _update_job(job, {"status": "failed", "error": f"allocation failed: {e}"})
+        return
+    ops = []
+    for r, amount in zip(_job_recipients(job["_id"], {"_id": 1}), lamports.tolist()):
+        if amount > 0:
+            ops.append(UpdateOne({"_id": r["_id"]}, {"$set": {
+                "sol": amount / LAMPORTS_PER_SOL, "lamports": amount, "state": "pending"}}))
+        if len(ops) >= BATCH_SIZE:
+            recipients.bulk_write(ops, ordered=False)
+            ops = []
+    if ops:
+        recipients.bulk_write(ops, ordered=False)
+    _update_job(job, {
+        "status": "snapshotted",
+        "recipients": int(points.size),
+        "total_points": int(points.sum()),
+    })
+
+def send_pending(job: dict, rpc):
+    # Outcome unknown: the worker died between the send and recording it. Never resend those.
+    recipients.update_many(
+        {"job_id": job["_id"], "state": "sending"},
+        {"$set": {"state": "failed", "error": "interrupted before the signature was recorded"}}
+    )
+    send = airdrop_sender(rpc)
+    while True:
+        batch = list(recipients.find({"job_id": job["_id"], "state": "pending"}, {"pubkey": 1, "lamports": 1})
+                     .limit(BATCH_SIZE))
+        if not batch:
+            break
+        ids = {r["pubkey"]: r["_id"] for r in batch}
+        recipients.update_many({"_id": {"$in": list(ids.values())}}, {"$set": {"state": "sending"}})
+        ops = []
+        for result in distribution.send_all({r["pubkey"]: r["lamports"] for r in batch}, send):
+            fields = {"state": result["status"], "sent_at": datetime.utcnow()}
+            if result["status"] == "sent":
+                fields["signature"] = result["signature"]
+            else:
+                fields["error"] = result["error"]
+            ops.append(UpdateOne({"_id": ids[result["pubkey"]]}, {"$set": fields}))
+        recipients.bulk_write(ops, ordered=False)
+        _update_job(job, {})
+
+def confirm_sent(job: dict, rpc):
+    while True:
+        batch = list(recipients.find({"job_id": job["_id"], "state": "sent"}, {"signature": 1})
+                     .limit(BATCH_SIZE))
+        if not batch:
+            break
+        # confirm_all reports its keys as "pubkey"; here they are recipient ids.
+        ops = []
+        for result in distribution.confirm_all(rpc, {r["_id"]: r["signature"] for r in batch}):
+            fields = {"state": result["status"]}
+            if "error" in result:
+                fields["error"] = result["error"]
+            ops.append(UpdateOne({"_id": result["pubkey"]}, {"$set": fields}))
+        recipients.bulk_write(ops, ordered=False)
+        _update_job(job, {})
+
+def run_job(job: dict, rpc):
+    """Drive a claimed job from whatever stage it is in to completion."""
+    if job["status"] == "queued":
+        snapshot(job)
+    if job["status"] == "failed":
+        return
+    if job["status"] == "snapshotted":
+        _update_job(job, {"status": "running"})
+    send_pending(job, rpc)
+    confirm_sent(job, rpc)
+    _update_job(job, {"status": "completed", "completed_at": datetime.utcnow()})
+
+def new_worker_id() -> str:
+    return f"{os.uname().nodename}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
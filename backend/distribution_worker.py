@@ -0,0 +1,52 @@
+#!/usr/bin/env python3
+"""
+distribution_worker.py
+
+Runs the payout jobs queued by GET /distribute (see distribution_jobs.py).
+Run one or more alongside the web server:
+
+    python distribution_worker.py            # poll forever
+    python distribution_worker.py --once     # drain the queue and exit
+
+A job is leased while a worker drives it; if the worker dies, another one
+picks the job up after the lease expires and carries on from the recorded
+recipient states.
+"""
+
+import argparse
+import time
+import traceback
+
+from distribution_jobs import claim_job, new_worker_id, run_job
+from rpc_pool import DEFAULT_RPC, get_client
+
+def main():
+    parser = argparse.ArgumentParser(description="Run queued /distribute payout jobs")
+    parser.add_argument("--once", action="store_true", help="exit when no job is waiting")
+    parser.add_argument("--poll", type=float, default=2.0, help="seconds between queue polls")
+    args = parser.parse_args()
+
+    worker_id = new_worker_id()
+    rpc = get_client(DEFAULT_RPC)
+    print(f"worker {worker_id} polling for distribution jobs")
+    while True:
+        job = claim_job(worker_id)
+        if job is None:
+            if args.once:
+                return
+            time.sleep(args.poll)
+            continue
+        print(f"▶ {job['_id']} ({job['status']})")
+        try:
+            run_job(job, rpc)
+            if job["status"] == "failed":
+                print(f"❌ {job['_id']} failed: {job['error']}")
+            else:
+                print(f"✅ {job['_id']} completed")
+        except Exception:
+            # The lease lapses and the job is retried from its recorded state.
+            traceback.print_exc()
+            time.sleep(args.poll)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,77 @@
+"""
+file_hashes.py
+
+SHA-256 cache for file-backed evidence and other reference assets, such as
+the fixed image serverVoting2 hashes on every /api/validate. An entry is
+keyed on the file's (size, mtime_ns). A replaced or edited file is rehashed
+the next time it is asked for. Between checks (FILE_HASH_RECHECK seconds)
+the cached digest is returned without touching the disk.
+"""
+
+import hashlib
+import os
+import threading
+import time
+
+FILE_HASH_RECHECK = float(os.environ.get("FILE_HASH_RECHECK", 1.0))
+CHUNK_SIZE        = 1024 * 1024
+
+_entries = {}  # path -> (size, mtime_ns, digest, checked_at)
+_lock = threading.Lock()
+_counters = {"hits": 0, "stat_checks": 0, "rehashes": 0, "missing": 0}
+
+def _sha256_path(path: str) -> str:
+    sha = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(CHUNK_SIZE), b""):
+            sha.update(chunk)
+    return sha.hexdigest()
+
+def peek(path: str):
+    """The cached digest if it was checked within FILE_HASH_RECHECK seconds, else None. No I/O."""
+    entry = _entries.get(path)
+    if entry is not None and time.monotonic() - entry[3] < FILE_HASH_RECHECK:
+        with _lock:
+            _counters["hits"] += 1
+        return entry[2]
+    return None
+
+def file_sha256(path: str):
+    """Hex SHA-256 of the file at `path`, or None if it does not exist."""
+    digest = peek(path)
+    if digest is not None:
+        return digest
+    try:
+        st = os.stat(path)
+    except FileNotFoundError:
+        with _lock:
+            _entries.pop(path, None)
+            _counters["missing"] += 1
+        return None
+    now = time.monotonic()
+    entry = _entries.get(path)
+    if entry is not None and entry[:2] == (st.st_size, st.st_mtime_ns):
+        with _lock:
+            _entries[path] = (*entry[:3], now)
+            _counters["stat_checks"] += 1
+        return entry[2]
+    try:
+        digest = _sha256_path(path)
+    except FileNotFoundError:
+        with _lock:
+            _counters["missing"] += 1
+        return None
+    with _lock:
+        _entries[path] = (st.st_size, st.st_mtime_ns, digest, now)
+        _counters["rehashes"] += 1
+    return digest
+
+def preload(*paths: str):
+    """Hash `paths` up front so the first request finds them cached."""
+    for path in paths:
+        if file_sha256(path) is None:
+            print(f"⚠️ Reference file not found: {path}")
+
+def file_hash_stats() -> dict:
+    with _lock:
+        return {**_counters, "files": len(_entries)}
@@ -0,0 +1,108 @@
+"""
+holder_snapshot.py
+
+Snapshot of every holder of an SPL mint from a single getProgramAccounts
+call. The Token program is filtered by account size (165 bytes) and by mint,
+and only the owner and amount bytes of each account are requested. Both are
+decoded locally, so no further RPC is made per account.
+
+Snapshots can be persisted to MongoDB one document per token account. Only
+the accounts whose owner or amount changed since the last snapshot of the
+mint are written, and vanished accounts are removed.
+"""
+
+from datetime import datetime
+
+from pymongo import DeleteOne, MongoClient, UpdateOne
+from solana.rpc.commitment import Confirmed
+from solana.rpc.types import DataSliceOpts, MemcmpOpts
+from solders.pubkey import Pubkey
+from spl.token.constants import TOKEN_PROGRAM_ID
+
+from balances import AMOUNT_OFFSET
+
+TOKEN_ACCOUNT_SIZE = 165
+OWNER_OFFSET = 32
+# owner (32) and amount (u64 LE) are adjacent in the account layout
+HOLDER_SLICE = DataSliceOpts(offset=OWNER_OFFSET, length=AMOUNT_OFFSET - OWNER_OFFSET + 8)
+WRITE_BATCH = 1000
+
+client    = MongoClient("mongodb://localhost:27017/")
+db        = client["sasehacks"]
+snapshots = db["holder_snapshots"]
+accounts  = db["holder_accounts"]
+
+_indexes_ready = False
+
+def _ensure_indexes():
+    global _indexes_ready
+    if not _indexes_ready:
+        accounts.create_index("mint")
+        _indexes_ready = True
+
+def fetch_accounts(rpc, mint_address: str):
+    """
+    Returns (slot, {token_account: (owner, amount)}) for every token account
+    of `mint_address`. The slot is read just before the scan, so the data is
+    at least that recent.
+    """
+    slot = rpc.get_slot(commitment=Confirmed).value
+    resp = rpc.get_program_accounts(
+        TOKEN_PROGRAM_ID,
+        commitment=Confirmed,
+        encoding="base64",
+        data_slice=HOLDER_SLICE,
+        filters=[TOKEN_ACCOUNT_SIZE, MemcmpOpts(offset=0, bytes=mint_address)]
+    )
+    found = {}
+    for keyed in resp.value:
+        data = bytes(keyed.account.data)
+        owner = str(Pubkey.from_bytes(data[:32]))
+        amount = int.from_bytes(data[32:40], "little")
+        found[str(keyed.pubkey)] = (owner, amount)
+    return slot, found
+
+def holder_totals(token_accounts: dict) -> dict:
+    """{owner: amount} summed over an owner's token accounts, holders with a balance only."""
+    totals = {}
+    for owner, amount in token_accounts.values():
+        if amount > 0:
+            totals[owner] = totals.get(owner, 0) + amount
+    return totals
+
+def persist(mint_address: str, slot: int, token_accounts: dict) -> dict:
+    """Write the difference against the stored snapshot of `mint_address`."""
+    _ensure_indexes()
+    last = snapshots.find_one({"_id": mint_address}, {"slot": 1})
+    stored = {
+        d["_id"]: (d["owner"], d["amount"])
+        for d in accounts.find({"mint": mint_address}, {"owner": 1, "amount": 1})
+    }
+    ops = [
+        UpdateOne({"_id": acct}, {"$set": {
+            "mint": mint_address, "owner": owner, "amount": amount, "slot": slot}}, upsert=True)
+        for acct, (owner, amount) in token_accounts.items()
+        if stored.get(acct) != (owner, amount)
+    ]
+    changed = len(ops)
+    ops += [DeleteOne({"_id": acct}) for acct in stored if acct not in token_accounts]
+    for i in range(0, len(ops), WRITE_BATCH):
+        accounts.bulk_write(ops[i:i + WRITE_BATCH], ordered=False)
+    snapshots.update_one(
+        {"_id": mint_address},
+        {"$set": {"slot": slot, "taken_at": datetime.utcnow(), "accounts": len(token_accounts)}},
+        upsert=True
+    )
+    return {
+        "previous_slot": last["slot"] if last else None,
+        "changed": changed,
+        "removed": len(ops) - changed,
+    }
+
+def take_snapshot(rpc, mint_address: str, save: bool = True):
+    """Returns ({owner: amount}, stats) for `mint_address`, persisting the diff if `save`."""
+    slot, token_accounts = fetch_accounts(rpc, mint_address)
+    stats = {"slot": slot, "accounts": len(token_accounts)}
+    if save:
+        stats.update(persist(mint_address, slot, token_accounts))
+    return holder_totals(token_accounts), stats
@@ -0,0 +1,108 @@
+#!/usr/bin/env python3
+"""
+import_off_dump.py
+
+Stream an OpenFoodFacts JSONL dump (plain, .gz or .zst) into the local
+barcode index read by off_index.lookup().
+
+  python import_off_dump.py openfoodfacts-products.jsonl.gz
+  python import_off_dump.py --delta openfoodfacts-delta.jsonl.gz
+
+A full import is built next to the live index and swapped in atomically when
+it is complete; --delta upserts the changed products into the live index.
+"""
+
+import argparse
+import gzip
+import io
+import json
+import os
+import time
+from datetime import datetime
+
+import off_index
+
+BATCH_SIZE = 10_000
+
+def open_dump(path: str):
+    """Open a dump for line-by-line text reading without decompressing it up front."""
+    if path.endswith(".gz"):
+        return gzip.open(path, "rt", encoding="utf-8")
+    if path.endswith(".zst"):
+        try:
+            import zstandard
+        except ImportError:
+            raise SystemExit("Reading .zst dumps requires the `zstandard` package")
+        raw = open(path, "rb")
+        reader = zstandard.ZstdDecompressor(max_window_size=2 ** 31).stream_reader(raw)
+        return io.TextIOWrapper(reader, encoding="utf-8")
+    return open(path, "r", encoding="utf-8")
+
+def iter_rows(lines):
+    for line in lines:
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            product = json.loads(line)
+        except ValueError:
+            continue
+        if product.get("code"):
+            yield off_index.to_row(product)
+
+def import_dump(dump_path: str, conn) -> int:
+    """Upsert every product of `dump_path` into the index open on `conn`."""
+    sql = "INSERT OR REPLACE INTO products (code, product_name, brands, packaging) VALUES (?, ?, ?, ?)"
+    count, started = 0, time.time()
+    batch = []
+    with open_dump(dump_path) as lines:
+        for row in iter_rows(lines):
+            batch.append(row)
+            if len(batch) >= BATCH_SIZE:
+                with conn:
+                    conn.executemany(sql, batch)
+                count += len(batch)
+                batch.clear()
+                if count % (BATCH_SIZE * 10) == 0:
+                    print(f"  {count:,} products ({count / (time.time() - started):,.0f}/s)")
+        if batch:
+            with conn:
+                conn.executemany(sql, batch)
+            count += len(batch)
+    with conn:
+        conn.execute(
+            "INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)",
+            ("last_import", json.dumps({"dump": os.path.basename(dump_path),
+                                        "at": datetime.utcnow().isoformat(),
+                                        "products": count}))
+        )
+    return count
+
+def main():
+    parser = argparse.ArgumentParser(description="Import an OpenFoodFacts JSONL dump into the local barcode index")
+    parser.add_argument("dump", help="path to a .jsonl, .jsonl.gz or .jsonl.zst dump")
+    parser.add_argument("--index", default=off_index.INDEX_PATH, help="index file (default: %(default)s)")
+    parser.add_argument("--delta", action="store_true", help="upsert into the existing index instead of rebuilding it")
+    args = parser.parse_args()
+
+    if args.delta:
+        print(f"Applying delta {args.dump} to {args.index}...")
+        conn = off_index.open_for_write(args.index)
+        count = import_dump(args.dump, conn)
+        conn.close()
+    else:
+        tmp_path = args.index + ".building"
+        for suffix in ("", "-wal", "-shm"):
+            if os.path.exists(tmp_path + suffix):
+                os.remove(tmp_path + suffix)
+        print(f"Building {args.index} from {args.dump}...")
+        conn = off_index.open_for_write(tmp_path)
+        count = import_dump(args.dump, conn)
+        conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+        conn.execute("PRAGMA journal_mode=DELETE")
+        conn.close()
+        os.replace(tmp_path, args.index)
+    print(f"Indexed {count:,} products.")
+
+if __name__ == "__main__":
+    main()
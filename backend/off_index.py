@@ -0,0 +1,84 @@
+"""
+off_index.py
+
+Local, read-mostly index of OpenFoodFacts products keyed by barcode, built
+from the OpenFoodFacts JSONL dump by import_off_dump.py. Only the fields the
+validation endpoints read are kept, so the whole catalogue fits in a few
+hundred MB and a lookup is a single B-tree probe.
+"""
+
+import os
+import sqlite3
+import threading
+
+INDEX_PATH = os.environ.get("OFF_INDEX_PATH", "off_index.db")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS products (
+    code         TEXT PRIMARY KEY,
+    product_name TEXT,
+    brands       TEXT,
+    packaging    INTEGER
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS meta (
+    key   TEXT PRIMARY KEY,
+    value TEXT
+) WITHOUT ROWID;
+"""
+
+_local = threading.local()
+
+def _connection():
+    """Per-thread read-only connection, reopened when a rebuild swaps the file."""
+    try:
+        inode = os.stat(INDEX_PATH).st_ino
+    except FileNotFoundError:
+        return None
+    conn = getattr(_local, "conn", None)
+    if conn is not None and _local.inode != inode:
+        conn.close()
+        conn = None
+    if conn is None:
+        conn = sqlite3.connect(f"file:{INDEX_PATH}?mode=ro", uri=True)
+        _local.conn, _local.inode = conn, inode
+    return conn
+
+def to_product(row) -> dict:
+    """Rebuild the subset of the OpenFoodFacts product dict we store."""
+    code, name, brands, packaging = row
+    product = {"code": code, "product_name": name, "brands": brands}
+    if packaging is not None:
+        product["ecoscore_data"] = {"adjustments": {"packaging": {"value": packaging}}}
+    return product
+
+def to_row(product: dict):
+    packaging = product.get("ecoscore_data", {}) \
+                       .get("adjustments", {}) \
+                       .get("packaging", {}) \
+                       .get("value")
+    if not isinstance(packaging, (int, float)):
+        packaging = None
+    return (
+        str(product["code"]),
+        product.get("product_name"),
+        product.get("brands"),
+        None if packaging is None else int(packaging),
+    )
+
+def lookup(barcode_id: str):
+    """Return the indexed product for `barcode_id`, or None if it is not indexed."""
+    conn = _connection()
+    if conn is None:
+        return None
+    row = conn.execute(
+        "SELECT code, product_name, brands, packaging FROM products WHERE code = ?",
+        (barcode_id,)
+    ).fetchone()
+    return to_product(row) if row else None
+
+def open_for_write(path: str) -> sqlite3.Connection:
+    conn = sqlite3.connect(path)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    conn.executescript(SCHEMA)
+    return conn
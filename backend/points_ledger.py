@@ -0,0 +1,171 @@
+#!/usr/bin/env python3
+"""
+points_ledger.py
+
+Append-only points ledger for the voting2 servers. Every award is one
+insert of (pubkey, epoch, delta, submission_id). Nothing ever updates a
+shared document, so writes do not contend and the collection can be sharded
+on pubkey.
+
+Epochs replace the old global reset. /distribute closes the current epoch
+and pays it out, while new awards already land in the next one. Once an
+epoch is closed its entries are compacted into per-(epoch, pubkey) totals,
+which the distribution snapshot reads. The ledger itself is kept for audits.
+
+    python points_ledger.py compact [epoch]   # default: every closed epoch not yet compacted
+    python points_ledger.py migrate           # carry wallet.points over into the ledger
+"""
+
+import os
+import sys
+import time
+from datetime import datetime, timedelta
+
+from pymongo import ASCENDING, MongoClient, ReturnDocument
+from pymongo.errors import DuplicateKeyError
+
+from ttl_cache import TTLCache, MISSING
+
+# Writers cache the current epoch this long; a closed epoch is only
+# snapshotted after EPOCH_GRACE so late writes to it are included.
+EPOCH_CACHE_TTL = float(os.environ.get("EPOCH_CACHE_TTL", 2))
+EPOCH_GRACE     = float(os.environ.get("EPOCH_GRACE", 10))
+
+client = MongoClient("mongodb://localhost:27017/")
+db     = client["sasehacks"]
+ledger = db["points_ledger"]
+totals = db["points_totals"]
+epochs = db["points_epochs"]
+
+_epoch_cache = TTLCache(max_size=1, ttl=EPOCH_CACHE_TTL)
+_indexes_ready = False
+
+def _ensure_indexes():
+    global _indexes_ready
+    if not _indexes_ready:
+        ledger.create_index([("pubkey", ASCENDING), ("epoch", ASCENDING)])
+        ledger.create_index([("epoch", ASCENDING), ("pubkey", ASCENDING)])
+        totals.create_index([("epoch", ASCENDING), ("points", ASCENDING)])
+        _indexes_ready = True
+
+def current_epoch(fresh: bool = False) -> int:
+    if not fresh:
+        cached = _epoch_cache.get("current", MISSING)
+        if cached is not MISSING:
+            return cached
+    doc = epochs.find_one_and_update(
+        {"_id": "current"},
+        {"$setOnInsert": {"epoch": 1, "started_at": datetime.utcnow()}},
+        upsert=True,
+        return_document=ReturnDocument.AFTER
+    )
+    _epoch_cache.set("current", doc["epoch"])
+    return doc["epoch"]
+
+def record(pubkey: str, delta: int, submission_id: str = None) -> int:
+    """Append an award to the current epoch. A repeated submission_id is ignored. Returns the epoch."""
+    _ensure_indexes()
+    epoch = current_epoch()
+    entry = {"pubkey": pubkey, "epoch": epoch, "delta": delta, "created_at": datetime.utcnow()}
+    if submission_id:
+        entry["_id"] = submission_id
+    try:
+        ledger.insert_one(entry)
+    except DuplicateKeyError:
+        pass
+    return epoch
+
+def _sum_by_pubkey(match: dict):
+    return ledger.aggregate([
+        {"$match": match},
+        {"$group": {"_id": "$pubkey", "points": {"$sum": "$delta"}}},
+    ])
+
+def points_of(pubkey: str, epoch: int = None) -> int:
+    """Points of `pubkey` in `epoch` (default: the open one)."""
+    epoch = current_epoch() if epoch is None else epoch
+    if epochs.find_one({"_id": epoch, "compacted_at": {"$exists": True}}, {"_id": 1}):
+        doc = totals.find_one({"_id": f"{epoch}:{pubkey}"}, {"points": 1})
+        return doc["points"] if doc else 0
+    row = next(_sum_by_pubkey({"pubkey": pubkey, "epoch": epoch}), None)
+    return row["points"] if row else 0
+
+def all_points(epoch: int = None) -> dict:
+    epoch = current_epoch() if epoch is None else epoch
+    return {row["_id"]: row["points"] for row in _sum_by_pubkey({"epoch": epoch})}
+
+def close_epoch(epoch: int = None) -> int:
+    """
+    Close `epoch` (default: the open one) so new awards go to the next epoch.
+    Closing an epoch that is already closed is a no-op. Returns the closed epoch.
+    """
+    if epoch is not None and epoch < 1:
+        raise ValueError(f"epoch must be 1 or later, got {epoch}")
+    current = current_epoch(fresh=True)
+    epoch = current if epoch is None else epoch
+    if epoch > current:
+        raise ValueError(f"epoch {epoch} has not started (current is {current})")
+    now = datetime.utcnow()
+    if epoch == current:
+        # Only the caller that still sees `epoch` open advances it.
+        epochs.update_one({"_id": "current", "epoch": epoch},
+                          {"$set": {"epoch": epoch + 1, "started_at": now}})
+        _epoch_cache.clear()
+    epochs.update_one({"_id": epoch}, {"$setOnInsert": {"closed_at": now}}, upsert=True)
+    return epoch
+
+def wait_for_grace(epoch: int):
+    """Block until writers that cached `epoch` as current can no longer write to it."""
+    doc = epochs.find_one({"_id": epoch}, {"closed_at": 1})
+    if doc is None:
+        raise ValueError(f"epoch {epoch} is not closed")
+    remaining = (doc["closed_at"] + timedelta(seconds=EPOCH_GRACE) - datetime.utcnow()).total_seconds()
+    if remaining > 0:
+        time.sleep(remaining)
+
+def compact(epoch: int):
+    """Rebuild the per-pubkey totals of a closed epoch from its ledger entries (idempotent)."""
+    _ensure_indexes()
+    wait_for_grace(epoch)
+    ledger.aggregate([
+        {"$match": {"epoch": epoch}},
+        {"$group": {"_id": "$pubkey", "points": {"$sum": "$delta"}}},
+        {"$project": {"_id": {"$concat": [str(epoch), ":", "$_id"]},
+                      "epoch": {"$literal": epoch}, "pubkey": "$_id", "points": 1}},
+        {"$merge": {"into": totals.name, "whenMatched": "replace", "whenNotMatched": "insert"}},
+    ])
+    epochs.update_one({"_id": epoch}, {"$set": {"compacted_at": datetime.utcnow()}})
+
+def iter_epoch_totals(epoch: int, batch_size: int = 1000):
+    """Yield (pubkey, points) with points > 0 for a compacted epoch."""
+    cursor = totals.find({"epoch": epoch, "points": {"$gt": 0}}, {"pubkey": 1, "points": 1}) \
+                   .batch_size(batch_size)
+    for d in cursor:
+        yield d["pubkey"], d["points"]
+
+def migrate_wallet_points(wallets) -> int:
+    """Record each wallet's legacy `points` field once in the open epoch."""
+    moved = 0
+    for d in wallets.find({"points": {"$gt": 0}}, {"points": 1}):
+        record(d["_id"], d["points"], submission_id=f"migration:{d['_id']}")
+        moved += 1
+    wallets.update_many({}, {"$unset": {"points": ""}})
+    return moved
+
+if __name__ == "__main__":
+    cmd = sys.argv[1] if len(sys.argv) > 1 else ""
+    if cmd == "compact":
+        if len(sys.argv) > 2:
+            todo = [int(sys.argv[2])]
+        else:
+            todo = [d["_id"] for d in epochs.find({"closed_at": {"$exists": True},
+                                                   "compacted_at": {"$exists": False}})]
+        for e in todo:
+            compact(e)
+            print(f"✅ compacted epoch {e}")
+    elif cmd == "migrate":
+        from wallet_manager_voting2 import col
+        print(f"✅ moved the points of {migrate_wallet_points(col)} wallets into epoch {current_epoch()}")
+    else:
+        print(__doc__)
+        sys.exit(1)
@@ -0,0 +1,177 @@
+"""
+product_cache.py
+
+Tiered cache in front of the OpenFoodFacts product lookup used by /api/validate:
+  0. the local dump index built by import_off_dump.py (see off_index.py), if present
+  1. an in-process LRU with TTL; stale entries are served while a background refresh runs
+  2. the `products` MongoDB collection next to `wallets`
+  3. world.openfoodfacts.org
+
+Barcodes OpenFoodFacts does not know (status != 1) are cached as well, for a shorter time.
+"""
+
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+
+import requests
+from pymongo import MongoClient
+
+import off_index
+from ttl_cache import TTLCache, MISSING
+
+OFF_PRODUCT_URL = "https://world.openfoodfacts.org/api/v0/product/{}.json"
+OFF_TIMEOUT = float(os.environ.get("OFF_TIMEOUT", 5))
+
+# In-process tier
+MEMORY_SIZE      = int(os.environ.get("PRODUCT_CACHE_SIZE", 10_000))
+MEMORY_TTL       = float(os.environ.get("PRODUCT_CACHE_TTL", 6 * 3600))
+MEMORY_STALE_TTL = float(os.environ.get("PRODUCT_CACHE_STALE_TTL", 24 * 3600))
+NEGATIVE_TTL     = float(os.environ.get("PRODUCT_CACHE_NEGATIVE_TTL", 3600))
+
+# MongoDB tier
+PERSIST_TTL          = timedelta(days=int(os.environ.get("PRODUCT_PERSIST_DAYS", 30)))
+PERSIST_NEGATIVE_TTL = timedelta(days=int(os.environ.get("PRODUCT_PERSIST_NEGATIVE_DAYS", 1)))
+
+client = MongoClient("mongodb://localhost:27017/")
+db     = client["sasehacks"]
+col    = db["products"]
+
+_memory = TTLCache(max_size=MEMORY_SIZE, ttl=MEMORY_TTL, stale_ttl=MEMORY_STALE_TTL)
+_session = requests.Session()
+_refresher = ThreadPoolExecutor(max_workers=4, thread_name_prefix="product-refresh")
+_refreshing = set()
+_lock = threading.Lock()
+_indexes_ready = False
+
+_counters = {
+    "index_hits": 0,
+    "persistent_hits": 0,
+    "persistent_misses": 0,
+    "negative_hits": 0,
+    "remote_fetches": 0,
+    "remote_errors": 0,
+    "refreshes": 0,
+}
+
+def _count(name: str):
+    with _lock:
+        _counters[name] += 1
+
+def slim_product(product: dict) -> dict:
+    """Keep only the product fields the validation endpoints read."""
+    packaging = product.get("ecoscore_data", {}) \
+                       .get("adjustments", {}) \
+                       .get("packaging", {})
+    slim = {
+        "code": product.get("code"),
+        "product_name": product.get("product_name"),
+        "brands": product.get("brands"),
+    }
+    if "value" in packaging:
+        slim["ecoscore_data"] = {"adjustments": {"packaging": {"value": packaging["value"]}}}
+    return slim
+
+def _ensure_indexes():
+    # Created lazily so importing this module never needs a reachable MongoDB.
+    global _indexes_ready
+    if not _indexes_ready:
+        col.create_index("expires_at", expireAfterSeconds=0)
+        _indexes_ready = True
+
+def _remember_memory(barcode_id: str, product):
+    _memory.set(barcode_id, product, ttl=MEMORY_TTL if product else NEGATIVE_TTL)
+
+def remember(barcode_id: str, product):
+    """Store a lookup result (None for unknown barcodes) in both cache tiers."""
+    product = slim_product(product) if product else None
+    _remember_memory(barcode_id, product)
+    ttl = PERSIST_TTL if product else PERSIST_NEGATIVE_TTL
+    now = datetime.utcnow()
+    _ensure_indexes()
+    col.replace_one(
+        {"_id": barcode_id},
+        {"_id": barcode_id, "product": product, "fetched_at": now, "expires_at": now + ttl},
+        upsert=True
+    )
+    return product
+
+def lookup_cached(barcode_id: str):
+    """
+    Look a barcode up in the cache tiers without going to OpenFoodFacts.
+    Returns (found, product); product is None for cached unknown barcodes.
+    """
+    product = off_index.lookup(barcode_id)
+    if product is not None:
+        _count("index_hits")
+        return True, product
+
+    product, stale = _memory.lookup(barcode_id)
+    if product is not MISSING:
+        if stale:
+            _schedule_refresh(barcode_id)
+        if product is None:
+            _count("negative_hits")
+        return True, product
+
+    doc = col.find_one({"_id": barcode_id, "expires_at": {"$gt": datetime.utcnow()}})
+    if doc is None:
+        _count("persistent_misses")
+        return False, None
+    _count("persistent_hits")
+    _remember_memory(barcode_id, doc["product"])
+    if doc["product"] is None:
+        _count("negative_hits")
+    return True, doc["product"]
+
+def _fetch_remote(barcode_id: str):
+    """Returns (cacheable, product). Non-200 answers are not cached."""
+    _count("remote_fetches")
+    try:
+        r = _session.get(OFF_PRODUCT_URL.format(barcode_id), timeout=OFF_TIMEOUT)
+    except requests.RequestException:
+        _count("remote_errors")
+        raise
+    if r.status_code != 200:
+        _count("remote_errors")
+        return False, None
+    d = r.json()
+    return True, (d["product"] if d.get("status") == 1 else None)
+
+def _refresh(barcode_id: str):
+    try:
+        cacheable, product = _fetch_remote(barcode_id)
+        if cacheable:
+            remember(barcode_id, product)
+            _count("refreshes")
+    except Exception as e:
+        print(f"⚠️ Product refresh failed for {barcode_id}: {e}")
+    finally:
+        with _lock:
+            _refreshing.discard(barcode_id)
+
+def _schedule_refresh(barcode_id: str):
+    with _lock:
+        if barcode_id in _refreshing:
+            return
+        _refreshing.add(barcode_id)
+    _refresher.submit(_refresh, barcode_id)
+
+def fetch_product(barcode_id: str):
+    """
+    Return the OpenFoodFacts product for `barcode_id`, or None if the
+    barcode is unknown or OpenFoodFacts did not answer with 200.
+    """
+    found, product = lookup_cached(barcode_id)
+    if found:
+        return product
+    cacheable, product = _fetch_remote(barcode_id)
+    if not cacheable:
+        return None
+    return remember(barcode_id, product)
+
+def cache_stats() -> dict:
+    with _lock:
+        counters = dict(_counters)
+    return {"memory": _memory.stats(), **counters}
@@ -0,0 +1,145 @@
+"""
+rpc_pool.py
+
+Shared Solana RPC clients. One `solana.rpc.api.Client` is kept per endpoint,
+backed by a pooled keep-alive httpx session, and `spl.token.client.Token`
+handles are cached per (endpoint, mint, payer) so callers stop paying a new
+connection for every balance lookup or mint.
+"""
+
+import os
+import threading
+import time
+
+import httpx
+from solana.rpc.api import Client
+from solana.rpc.async_api import AsyncClient
+from solders.pubkey import Pubkey
+from spl.token.client import Token
+from spl.token.constants import TOKEN_PROGRAM_ID
+
+DEFAULT_RPC = os.environ.get("SOLANA_RPC_URL", "http://127.0.0.1:8899")
+RPC_TIMEOUT        = float(os.environ.get("RPC_TIMEOUT", 10))
+RPC_POOL_SIZE      = int(os.environ.get("RPC_POOL_SIZE", 32))
+RPC_KEEPALIVE_SIZE = int(os.environ.get("RPC_KEEPALIVE_SIZE", 16))
+RPC_KEEPALIVE_TTL  = float(os.environ.get("RPC_KEEPALIVE_TTL", 30))
+
+_clients = {}
+_tokens = {}
+_lock = threading.Lock()
+
+_stats = {
+    "clients_created": 0,
+    "client_reuses": 0,
+    "tokens_created": 0,
+    "token_reuses": 0,
+    "http_requests": 0,
+    "connections_opened": 0,
+}
+_method_stats = {}  # method -> {"calls", "errors", "total_ms", "max_ms"}
+
+def _count(name: str, n: int = 1):
+    with _lock:
+        _stats[name] += n
+
+def _trace(event_name: str, info: dict):
+    # httpcore reports a TCP connect only when the pool had no idle connection to reuse.
+    if event_name == "connection.connect_tcp.complete":
+        _count("connections_opened")
+
+def _on_request(request: httpx.Request):
+    _count("http_requests")
+    request.extensions["trace"] = _trace
+
+def _record_call(method: str, elapsed_ms: float, failed: bool):
+    with _lock:
+        m = _method_stats.setdefault(method, {"calls": 0, "errors": 0, "total_ms": 0.0, "max_ms": 0.0})
+        m["calls"] += 1
+        m["errors"] += failed
+        m["total_ms"] += elapsed_ms
+        m["max_ms"] = max(m["max_ms"], elapsed_ms)
+
+def _timed(make_request, method_of):
+    def wrapper(*args, **kwargs):
+        started = time.perf_counter()
+        failed = True
+        try:
+            result = make_request(*args, **kwargs)
+            failed = False
+            return result
+        finally:
+            _record_call(method_of(args), (time.perf_counter() - started) * 1000, failed)
+    return wrapper
+
+def _limits() -> httpx.Limits:
+    return httpx.Limits(
+        max_connections=RPC_POOL_SIZE,
+        max_keepalive_connections=RPC_KEEPALIVE_SIZE,
+        keepalive_expiry=RPC_KEEPALIVE_TTL,
+    )
+
+def _build_client(endpoint: str) -> Client:
+    client = Client(endpoint, timeout=RPC_TIMEOUT)
+    provider = client._provider
+    provider.session.close()
+    provider.session = httpx.Client(
+        timeout=RPC_TIMEOUT,
+        limits=_limits(),
+        event_hooks={"request": [_on_request]},
+    )
+    provider.make_request = _timed(provider.make_request, lambda a: type(a[0]).__name__)
+    provider.make_batch_request = _timed(provider.make_batch_request, lambda a: "batch")
+    return client
+
+def get_client(endpoint: str = DEFAULT_RPC) -> Client:
+    """Return the shared, thread-safe client for `endpoint`."""
+    client = _clients.get(endpoint)
+    if client is not None:
+        _count("client_reuses")
+        return client
+    with _lock:
+        client = _clients.get(endpoint)
+        if client is None:
+            client = _clients[endpoint] = _build_client(endpoint)
+            _stats["clients_created"] += 1
+            return client
+    _count("client_reuses")
+    return client
+
+def build_async_client(endpoint: str = DEFAULT_RPC) -> AsyncClient:
+    """AsyncClient with the same pool limits; owned (and closed) by the caller's event loop."""
+    client = AsyncClient(endpoint, timeout=RPC_TIMEOUT)
+    client._provider.session = httpx.AsyncClient(timeout=RPC_TIMEOUT, limits=_limits())
+    return client
+
+def get_token(mint_address: str, payer, endpoint: str = DEFAULT_RPC, program_id=TOKEN_PROGRAM_ID) -> Token:
+    """Return a cached Token handle for `mint_address` paid for by `payer`."""
+    key = (endpoint, mint_address, str(payer.pubkey()), str(program_id))
+    token = _tokens.get(key)
+    if token is not None:
+        _count("token_reuses")
+        return token
+    token = Token(
+        conn=get_client(endpoint),
+        pubkey=Pubkey.from_string(mint_address),
+        program_id=program_id,
+        payer=payer
+    )
+    with _lock:
+        if key in _tokens:
+            _stats["token_reuses"] += 1
+            return _tokens[key]
+        _tokens[key] = token
+        _stats["tokens_created"] += 1
+    return token
+
+def rpc_stats() -> dict:
+    with _lock:
+        stats = dict(_stats)
+        methods = {
+            name: {**m, "avg_ms": m["total_ms"] / m["calls"] if m["calls"] else 0.0}
+            for name, m in _method_stats.items()
+        }
+    stats["connection_reuses"] = max(0, stats["http_requests"] - stats["connections_opened"])
+    stats["methods"] = methods
+    return stats
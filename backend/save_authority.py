@@ -1,9 +1,10 @@
 # save_authority.py
 
 from pymongo import MongoClient
-import hashlib
 import json
 
+from auth import make_hash
+
 # Load the secret_key list from the JSON file
 with open("authority.json","r") as f:
     SECRET_KEY_LIST = json.load(f)
@@ -15,7 +16,7 @@ client = MongoClient("mongodb://localhost:27017/")
 db     = client["sasehacks"]
 col    = db["wallets"]
 
-dummy_pw_hash = hashlib.sha256(b"authority").hexdigest()
+dummy_pw_hash = make_hash("authority")
 
 col.replace_one(
     {"_id": MINT_AUTH_PUBKEY},
@@ -22,11 +22,14 @@ from solders.pubkey import Pubkey
 from walletGen import generate_wallet
 from wallet_manager import add_wallet, wallet_exists, get_wallet_info, verify_password
 from tokenGen import mint_spl_token, get_spl_balance
+from phash_index import photos
+from uploads import install as install_uploads, sha256_of
 
 import requests
 
 app = Flask(__name__)
 CORS(app)
+install_uploads(app)
 
 def fetch_product(barcode_id: str):
     """
@@ -55,11 +58,10 @@ def map_score_to_tokens(score: int) -> int:
 
 @app.route("/signup", methods=["POST"])
 def signup():
-    wallet, password, wallet_file = generate_wallet()
-    add_wallet(str(wallet.pubkey()), wallet_file, password)
+    wallet, password = generate_wallet()
+    add_wallet(str(wallet.pubkey()), list(wallet.to_bytes()), password)
     return jsonify({
         "pubkey": str(wallet.pubkey()),
-        "wallet_file": wallet_file,
         "password": password
     })
 
@@ -102,7 +104,12 @@ def validate_and_mint():
         return jsonify({"error":"invalid barcode"}), 400
 
     # 3) Compute image hash
-    image_hash = hashlib.sha256(files["image"].read()).hexdigest()
+    image_hash = sha256_of(files["image"])
+    phash, seen = photos.claim_upload(files["image"], image_hash)
+    if phash is None:
+        return jsonify({"error": "image could not be decoded"}), 400
+    if seen:
+        return jsonify({"error": "similar image already submitted", "similar_to": seen[0]}), 409
 
     # 4) Compute recyclability score & token count
     score  = fetch_packaging_score(product)
@@ -114,7 +121,8 @@ def validate_and_mint():
     ).hexdigest()
 
     # 6) Mint tokens
-    mint_tx   = mint_spl_token(pubkey, submission_id, tokens)
+    with photos.held(image_hash):
+        mint_tx   = mint_spl_token(pubkey, submission_id, tokens)
     spl_bal   = get_spl_balance(pubkey)
 
     return jsonify({
@@ -133,7 +141,7 @@ def wallet_info(pubkey):
     if not wallet_exists(pubkey):
         return jsonify({"error":"wallet not found"}), 404
     info    = get_wallet_info(pubkey)
-    spl_bal = get_spl_balance(pubkey)
+    spl_bal = get_spl_balance(pubkey, fresh=request.args.get("fresh") == "1")
     return jsonify({"wallet_info": info, "spl_balance": spl_bal})
 
 if __name__=="__main__":
@@ -3,38 +3,34 @@
 from datetime import datetime
 from flask import Flask, request, jsonify
 from flask_cors import CORS
-import requests
 import hashlib
 
+from product_cache import fetch_product
+
 from walletGenVoting import generate_wallet
 from wallet_manager_voting import (
     add_wallet, wallet_exists, get_wallet_info, verify_password
 )
 from tokenGenVoting import (
     mint_primary, get_primary_balance,
-    mint_reward, get_reward_balance,
-    load_authority, PRIMARY_MINT, REWARD_MINT
+    mint_reward, get_reward_balance, get_reward_balances,
+    load_authority, LOCAL_RPC, PRIMARY_MINT, REWARD_MINT
 )
-
-from solders.pubkey import Pubkey
-
-from solana.rpc.api import Client
-from spl.token.client import Token
-from spl.token.constants import TOKEN_PROGRAM_ID
-from solders.pubkey import Pubkey
-
-from solana.rpc.types import MemcmpOpts
+from rpc_pool import get_client
+from tx_packer import mint_packed
+from distribution import allocate
+from holder_snapshot import take_snapshot
+from balances import invalidate as invalidate_balance
+from auth import check_token, issue_token, request_token, revoke
+from phash_index import photos
+from uploads import install as install_uploads, sha256_of
 
 
 app = Flask(__name__)
 CORS(app)
+install_uploads(app)
 
-def fetch_product(barcode_id):
-    url = f"https://world.openfoodfacts.org/api/v0/product/{barcode_id}.json"
-    r = requests.get(url, timeout=5)
-    if r.status_code != 200: return None
-    d = r.json()
-    return d["product"] if d.get("status") == 1 else None
+REWARD_TOTAL = 100  # reward-token base units split across holders per /distribute
 
 def map_score_to_tokens(score):
     return min(5, max(1, score // 20 + 1))
@@ -49,41 +45,62 @@ def signup():
 def signin():
     d = request.get_json() or {}
     pk, pw = d.get("pubkey"), d.get("password")
-    if not pk or not pw:
+    token = request_token(d, request.headers)
+    if not pk or not (pw or token):
         return jsonify({"error": "pubkey & password required"}), 400
     if not wallet_exists(pk):
         return jsonify({"error": "wallet not found"}), 404
-    if not verify_password(pk, pw):
+    if not (token and check_token(token, pk)) and not (pw and verify_password(pk, pw)):
         return jsonify({"error": "invalid password"}), 403
     return jsonify({
         "wallet_info": get_wallet_info(pk),
         "primary_balance": get_primary_balance(pk),
-        "reward_balance": get_reward_balance(pk)
+        "reward_balance": get_reward_balance(pk),
+        "session_token": issue_token(pk)
     })
 
+@app.route("/signout", methods=["POST"])
+def signout():
+    token = request_token(request.get_json(silent=True) or {}, request.headers)
+    if token:
+        revoke(token)
+    return jsonify({"status": "signed out"})
+
 @app.route("/api/validate", methods=["POST"])
 def validate_and_mint():
     form, files = request.form, request.files
-    for f in ("barcode_id", "pubkey", "password"):
+    # A session token from /signin replaces the password and skips the wallet lookups
+    token = request_token(form, request.headers)
+    for f in ("barcode_id", "pubkey") if token else ("barcode_id", "pubkey", "password"):
         if f not in form: return jsonify({"error": f"Missing {f}"}), 400
     if "image" not in files:
         return jsonify({"error": "Missing image"}), 400
 
-    b, pk, pw = form["barcode_id"], form["pubkey"], form["password"]
-    if not wallet_exists(pk):
+    b, pk = form["barcode_id"], form["pubkey"]
+    if token:
+        if not check_token(token, pk):
+            return jsonify({"error": "invalid or expired token"}), 401
+    elif not wallet_exists(pk):
         return jsonify({"error": "wallet not found"}), 404
-    if not verify_password(pk, pw):
+    elif not verify_password(pk, form["password"]):
         return jsonify({"error": "invalid credentials"}), 403
 
     prod = fetch_product(b)
     if not prod: return jsonify({"error": "invalid barcode"}), 400
 
-    img_hash = hashlib.sha256(files["image"].read()).hexdigest()
+    img_hash = sha256_of(files["image"])
+    phash, seen = photos.claim_upload(files["image"], img_hash)
+    if phash is None:
+        return jsonify({"error": "image could not be decoded"}), 400
+    if seen:
+        return jsonify({"error": "similar image already submitted", "similar_to": seen[0]}), 409
+
     score = prod.get("ecoscore_data", {}).get("adjustments", {}).get("packaging", {}).get("value", 0)
     tokens = map_score_to_tokens(score)
     sub_id = hashlib.sha256(f"{b}|{img_hash}|{datetime.utcnow().isoformat()}".encode()).hexdigest()
 
-    tx_primary = mint_primary(pk, tokens)
+    with photos.held(img_hash):
+        tx_primary = mint_primary(pk, tokens)
     primary = get_primary_balance(pk)
 
     return jsonify({
@@ -97,74 +114,32 @@ def validate_and_mint():
 def distribute_rewards():
     print("⚡ Distribute route triggered")
     auth = load_authority()
-    client = Client("http://127.0.0.1:8899")
-
-    # Use base64 encoding to avoid JSON decoding issues
-    resp = client.get_program_accounts(
-        TOKEN_PROGRAM_ID,
-        encoding="base64",  # <- avoids SerdeJSONError
-        filters=[
-            MemcmpOpts(offset=0, bytes=PRIMARY_MINT)
-        ]
-    )
-
-    holders = {}
-    total_votes = 0
-
-    # Step through each account and check token balance + owner
-    for acct in resp.value:
-        account_pubkey = acct.pubkey
-        bal_resp = client.get_token_account_balance(account_pubkey)
-        info_resp = client.get_account_info(account_pubkey)
-
-        amount = int(bal_resp.value.amount)
-        owner = str(info_resp.value.owner)
-
-        if amount > 0:
-            holders[owner] = holders.get(owner, 0) + amount
-            total_votes += amount
-
-    if total_votes == 0:
+    client = get_client(LOCAL_RPC)
+
+    holders, snapshot = take_snapshot(client, PRIMARY_MINT)
+    if not holders:
         return jsonify({"error": "no holders"}), 400
 
-    # Proportional reward calculation
-    distribution = {}
-    tokens_left = 100
-    for owner, votes in holders.items():
-        amt = (votes * 100) // total_votes
-        distribution[owner] = amt
-        tokens_left -= amt
-
-    sorted_holders = sorted(holders.items(), key=lambda x: x[1], reverse=True)
-    idx = 0
-    while tokens_left > 0:
-        o = sorted_holders[idx % len(sorted_holders)][0]
-        distribution[o] += 1
-        tokens_left -= 1
-        idx += 1
-
-    # Mint rewards
-    reward_token = Token(
-        conn=client,
-        pubkey=Pubkey.from_string(REWARD_MINT),
-        program_id=TOKEN_PROGRAM_ID,
-        payer=auth
-    )
+    # Proportional reward calculation, in reward-token base units
+    distribution = allocate(holders, REWARD_TOTAL)
 
+    # Mint rewards, many recipients per transaction
+    minted = mint_packed(client, auth, REWARD_MINT, distribution)
     tx_results = {}
-    for owner, amt in distribution.items():
-        owner_pubkey = Pubkey.from_string(owner)
-        try:
-            ata = reward_token.create_associated_token_account(owner_pubkey)
-        except Exception:
-            ata = reward_token.get_associated_token_address(owner_pubkey)
-        reward_token.mint_to(ata, auth, amt)
-        tx_results[owner] = amt
-
+    for owner, outcome in minted.items():
+        if "signature" in outcome:
+            invalidate_balance(owner, REWARD_MINT)
+            tx_results[owner] = distribution[owner]
+    failed = {owner: outcome["error"] for owner, outcome in minted.items() if "error" in outcome}
 
     return jsonify({
         "distribution": tx_results,
-        "reward_mint": REWARD_MINT
+        "reward_mint": REWARD_MINT,
+        # Recipients' new balances in a few batched reads instead of one RPC each
+        "reward_balances": get_reward_balances(list(tx_results)),
+        "snapshot_slot": snapshot["slot"],
+        "txs": {owner: outcome["signature"] for owner, outcome in minted.items() if "signature" in outcome},
+        "failed": failed
     })
 
 
@@ -175,10 +150,11 @@ def distribute_rewards():
 @app.route("/wallet/<pubkey>", methods=["GET"])
 def wallet_info(pubkey):
     if not wallet_exists(pubkey): return jsonify({"error": "wallet not found"}), 404
+    fresh = request.args.get("fresh") == "1"
     return jsonify({
         "wallet_info": get_wallet_info(pubkey),
-        "primary_balance": get_primary_balance(pubkey),
-        "reward_balance": get_reward_balance(pubkey)
+        "primary_balance": get_primary_balance(pubkey, fresh),
+        "reward_balance": get_reward_balance(pubkey, fresh)
     })
 
 if __name__ == "__main__":
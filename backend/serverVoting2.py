@@ -5,67 +5,81 @@ serverVoting2.py
 Flask server with endpoints:
   • POST /signup
   • POST /signin
+  • POST /signout
   • POST /api/validate
   • GET  /wallet/<pubkey>
   • GET  /distribute
+  • GET  /distribute/<job_id>
+  • GET  /stats
+
+Start with --async to serve the asyncio variant (serverVoting2Async.py) instead.
 """
 
 import hashlib
+from concurrent.futures import TimeoutError as FutureTimeout
 from datetime import datetime
 from flask import Flask, request, jsonify
 from flask_cors import CORS
-import requests
-
+from product_cache import fetch_product, cache_stats
+from file_hashes import file_hash_stats, file_sha256, preload
+from rpc_pool import DEFAULT_RPC, get_client, rpc_stats
+from balances import balance_cache_stats
+from award_buffer import awards
+from auth import check_token, issue_token, request_token, revoke, verify_stored
+from distribution_jobs import check_policy, create_job, job_progress
+from points_ledger import close_epoch
 from tokenGenVoting2 import get_token_client, REWARD_MINT, load_authority  # add load_authority if not already
 from solders.keypair import Keypair
 
 from spl.token.instructions import get_associated_token_address
 
-from walletGenVoting2 import generate_wallet
+from signup_pool import signups
+from submission_dedup import dedup
+from voting2_common import AIR_DROP_TOTAL_SOL, LOCAL_IMAGE_PATH, map_score_to_points
+from wallet_repo import request_wallets
 from wallet_manager_voting2 import (
-    add_wallet, wallet_exists, load_keypair_from_db, get_wallet_info,
-    verify_password, add_points, get_points, get_all_points, col
+    wallet_exists, load_keypair_from_db, get_wallet_info,
+    verify_password, add_points, award_points, get_points, get_all_points, col
 )
 from tokenGenVoting2 import mint_reward, get_reward_balance, REWARD_MINT
 
 app = Flask(__name__)
 CORS(app)
 
-def fetch_product(barcode_id):
-    url = f"https://world.openfoodfacts.org/api/v0/product/{barcode_id}.json"
-    r = requests.get(url, timeout=5)
-    if r.status_code != 200:
-        return None
-    d = r.json()
-    return d["product"] if d.get("status") == 1 else None
-
-def map_score_to_points(score: int) -> int:
-    # Map a packaging score (0-100) to points (1-5)
-    return min(5, max(1, score // 20 + 1))
-
 @app.route("/signup", methods=["POST"])
 def signup():
-    pk, sk, pwd = generate_wallet()
-    add_wallet(pk, sk, pwd)
+    pk, pwd = signups.signup()
     return jsonify({"pubkey": pk, "password": pwd})
 
 @app.route("/signin", methods=["POST"])
 def signin():
     data = request.get_json() or {}
     pk, pw = data.get("pubkey"), data.get("password")
-    if not pk or not pw:
+    # A valid session token from an earlier sign-in skips the password KDF
+    token = request_token(data, request.headers)
+    if not pk or not (pw or token):
         return jsonify({"error": "pubkey & password required"}), 400
-    if not wallet_exists(pk):
+    wallet = request_wallets(col).get(pk, "signin")
+    if not wallet:
         return jsonify({"error": "wallet not found"}), 404
-    if not verify_password(pk, pw):
+    if not (token and check_token(token, pk)) and \
+            not (pw and verify_stored(col, pk, wallet.password_hash, pw)):
         return jsonify({"error": "invalid password"}), 403
-    info = get_wallet_info(pk)
+    info = wallet.public_info(get_points(pk))
     return jsonify({
         "wallet_info": info,
         "points": info.get("points", 0),
-        "reward_balance": get_reward_balance(pk)
+        "reward_balance": get_reward_balance(pk),
+        "session_token": issue_token(pk)
     })
 
+@app.route("/signout", methods=["POST"])
+def signout():
+    token = request_token(request.get_json(silent=True) or {}, request.headers)
+    if token:
+        revoke(token)
+    return jsonify({"status": "signed out"})
+
 """""
 @app.route("/api/validate", methods=["POST"])
 def validate_and_award():
@@ -110,7 +124,8 @@ def validate_and_award():
     })
 """""
 
-LOCAL_IMAGE_PATH = "/Users/lalkattil/Desktop/SASEHacks2025/IMG_7212.JPG"
+# Hash the evidence image now, so the first /api/validate finds its digest cached
+preload(LOCAL_IMAGE_PATH)
 
 @app.route("/api/validate", methods=["POST"])
 def validate_and_award_fixed_image():
@@ -124,33 +139,47 @@ def validate_and_award_fixed_image():
     barcode = form["barcode_id"]
     pk      = form["pubkey"]
 
-    if not wallet_exists(pk):
+    if not request_wallets(col).get(pk, "exists"):
         return jsonify({"error": "wallet not found"}), 404
 
     prod = fetch_product(barcode)
     if not prod:
         return jsonify({"error": "invalid barcode"}), 400
 
-    # Always hash the same local image file
-    try:
-        with open(LOCAL_IMAGE_PATH, "rb") as imgf:
-            img_bytes = imgf.read()
-    except FileNotFoundError:
+    # Always the same local image file
+    img_hash = file_sha256(LOCAL_IMAGE_PATH)
+    if img_hash is None:
         return jsonify({"error": "local image not found"}), 500
 
-    img_hash = hashlib.sha256(img_bytes).hexdigest()
-
     score = prod.get("ecoscore_data", {}) \
                 .get("adjustments", {}) \
                 .get("packaging", {}) \
                 .get("value", 0)
     pts   = map_score_to_points(score)
 
-    add_points(pk, pts)
-    total_pts    = get_points(pk)
     submission_id = hashlib.sha256(
         f"{barcode}|{img_hash}|{datetime.utcnow().isoformat()}".encode()
     ).hexdigest()
+    # The same barcode and photo from the same wallet only earns points once per window
+    claimed, earlier = dedup.claim(barcode, img_hash, pk, submission_id)
+    if not claimed:
+        return jsonify({"error": "submission already claimed", "submission_id": earlier}), 409
+    try:
+        total_pts = award_points(pk, pts, submission_id)
+    except FutureTimeout:
+        # Still queued in the award buffer and may yet be written, so the claim stays
+        return jsonify({
+            "status":         "pending",
+            "message":        "award is still being recorded",
+            "barcode_id":     barcode,
+            "image_hash":     img_hash,
+            "packaging_score": score,
+            "points_awarded": pts,
+            "submission_id":  submission_id
+        }), 202
+    except Exception:
+        dedup.release(barcode, img_hash, pk, submission_id)
+        raise
 
     return jsonify({
         "status":         "success",
@@ -177,26 +206,21 @@ def wallet_info(pubkey):
 
 @app.route("/wallet/<pubkey>", methods=["GET"])
 def wallet_info(pubkey):
-    if not wallet_exists(pubkey):
-        return jsonify({"error": "wallet not found"}), 404
-
-    # Fetch wallet info and password hash
-    doc = col.find_one(
-        {"_id": pubkey},
-        {"secret_key": 0}  # omit secret_key
-    )
-    if not doc:
+    # One projected read: the password hash, never the secret key
+    wallet = request_wallets(col).get(pubkey, "wallet")
+    if not wallet:
         return jsonify({"error": "wallet not found"}), 404
 
     # Build response
+    points = get_points(pubkey)
     resp = {
         "wallet_info": {
             "pubkey": pubkey,
-            "password_hash": doc.get("password_hash"),
-            "points": doc.get("points", 0)
+            "password_hash": wallet.password_hash,
+            "points": points
         },
-        "points": doc.get("points", 0),
-        "reward_balance": get_reward_balance(pubkey)
+        "points": points,
+        "reward_balance": get_reward_balance(pubkey, fresh=request.args.get("fresh") == "1")
     }
     return jsonify(resp)
 
@@ -232,7 +256,7 @@ def distribute_rewards():
     })
 """""
 
-RPC_URL = "http://127.0.0.1:8899"
+RPC_URL = DEFAULT_RPC
 from solders.pubkey import Pubkey
 from solana.rpc.api import Client
 
@@ -247,51 +271,34 @@ from solders.pubkey import Pubkey
 from spl.token.client import Token
 from spl.token.constants import TOKEN_PROGRAM_ID
 
-AIR_DROP_TOTAL_SOL = 100  # total SOL to split among wallets
-
-RPC_URL = "http://127.0.0.1:8899"
-AIR_DROP_TOTAL_SOL = 100  # total SOL to split among wallets
-
 @app.route("/distribute", methods=["GET"])
 def distribute_sol_by_points():
-    pts_map = get_all_points()
-    total_pts = sum(pts_map.values())
-    if total_pts == 0:
-        return jsonify({"error": "no points to distribute"}), 400
-
-    raw = {pk: (pts / total_pts) * AIR_DROP_TOTAL_SOL for pk, pts in pts_map.items()}
-    floor = {pk: int(raw[pk]) for pk in raw}
-    distributed = sum(floor.values())
-    remainder = AIR_DROP_TOTAL_SOL - distributed
-
-    fracs = sorted(raw.items(), key=lambda kv: raw[kv[0]] - floor[kv[0]], reverse=True)
-    for pk, _ in fracs[:remainder]:
-        floor[pk] += 1
-
-    client = Client(RPC_URL)
-    lamports_per_sol = 1_000_000_000
-
-    airdrops = {}
-    for pk, sol_amt in floor.items():
-        if sol_amt <= 0:
-            continue
-        lamports = sol_amt * lamports_per_sol
-        resp = client.request_airdrop(Pubkey.from_string(pk), lamports)
-        airdrops[pk] = {
-            "sol": sol_amt,
-            "lamports": lamports,
-            "signature": str(resp.value)
-        }
-
-    col.update_many({}, {"$set": {"points": 0}})
-
+    """
+    Close the open points epoch (or ?epoch=N if it is still open) and queue
+    the airdrop of AIR_DROP_TOTAL_SOL across its wallets in proportion to
+    their points. The payout runs in distribution_worker.py; one job exists
+    per epoch, so repeating the call with ?epoch=N returns the same job.
+    """
+    try:
+        check_policy(AIR_DROP_TOTAL_SOL)  # before the epoch is closed, not after
+        epoch = close_epoch(int(request.args["epoch"]) if "epoch" in request.args else None)
+        job, created = create_job(AIR_DROP_TOTAL_SOL, epoch)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
     return jsonify({
-        "airdrop_total_sol": AIR_DROP_TOTAL_SOL,
-        "distribution": floor,
-        "airdrops": airdrops
-    })
-
+        "job_id": job["_id"],
+        "epoch": job["epoch"],
+        "status": job["status"],
+        "created": created,
+        "progress_url": f"/distribute/{job['_id']}"
+    }), 202 if created else 200
 
+@app.route("/distribute/<job_id>", methods=["GET"])
+def distribute_progress(job_id):
+    progress = job_progress(job_id)
+    if progress is None:
+        return jsonify({"error": "job not found"}), 404
+    return jsonify(progress)
 
 
 @app.route("/total", methods=["GET"])
@@ -299,7 +306,7 @@ def total_supply():
     """
     Return the total minted supply of the reward token.
     """
-    client = Client(RPC_URL)
+    client = get_client(RPC_URL)
     resp = client.get_token_supply(Pubkey.from_string(REWARD_MINT))
     if not resp or not resp.value:
         return jsonify({"error": "could not fetch supply"}), 500
@@ -317,6 +324,27 @@ def total_supply():
         "amount": human
     })
 
+@app.route("/stats", methods=["GET"])
+def stats():
+    return jsonify({
+        "product_cache": cache_stats(),
+        "balance_cache": balance_cache_stats(),
+        "award_buffer": awards.stats(),
+        "signup_pool": signups.stats(),
+        "file_hashes": file_hash_stats(),
+        "submission_dedup": dedup.stats(),
+        "rpc": rpc_stats()
+    })
+
 
 if __name__ == "__main__":
-    app.run(port=8888, debug=True)
+    import argparse
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--async", dest="use_async", action="store_true",
+                        help="serve the asyncio variant from serverVoting2Async.py")
+    args = parser.parse_args()
+    if args.use_async:
+        from serverVoting2Async import app as async_app
+        async_app.run(port=8888)
+    else:
+        app.run(port=8888, debug=True)
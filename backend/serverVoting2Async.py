@@ -0,0 +1,262 @@
+#!/usr/bin/env python3
+"""
+serverVoting2Async.py
+
+asyncio (Quart/ASGI) variant of serverVoting2.py with the same endpoints and
+JSON responses. MongoDB goes through Motor, Solana RPC through AsyncClient and
+OpenFoodFacts through httpx, so the independent lookups of a request run
+concurrently and slow upstream calls do not hold a thread each.
+
+Run with `python serverVoting2.py --async`, or `hypercorn serverVoting2Async:app`.
+"""
+
+import asyncio
+import hashlib
+from concurrent.futures import TimeoutError as FutureTimeout
+from datetime import datetime
+
+import httpx
+from motor.motor_asyncio import AsyncIOMotorClient
+from quart import Quart, request, jsonify
+from quart_cors import cors
+from solders.pubkey import Pubkey
+
+from auth import check_hash_async, check_token, hash_password_async, issue_token, request_token, revoke
+from award_buffer import awards
+from balances import balance_cache_stats, get_owner_balance_async
+from distribution_jobs import check_policy, create_job, job_progress
+from file_hashes import file_hash_stats, file_sha256, peek
+from points_ledger import close_epoch
+from product_cache import OFF_PRODUCT_URL, OFF_TIMEOUT, cache_stats, lookup_cached, remember
+from rpc_pool import DEFAULT_RPC, build_async_client
+from signup_pool import signups
+from submission_dedup import dedup
+from tokenGenVoting2 import REWARD_MINT
+from voting2_common import AIR_DROP_TOTAL_SOL, LOCAL_IMAGE_PATH, map_score_to_points
+from wallet_repo import projection
+from wallet_manager_voting2 import award_points, get_points
+
+app = cors(Quart(__name__))
+
+mongo   = AsyncIOMotorClient("mongodb://localhost:27017/")
+wallets = mongo["sasehacks"]["wallets"]
+
+# Created per event loop in before_serving
+rpc = None
+http = None
+
+@app.before_serving
+async def open_clients():
+    global rpc, http
+    rpc = build_async_client(DEFAULT_RPC)
+    http = httpx.AsyncClient(timeout=OFF_TIMEOUT)
+    # Start filling the keypair pool before the first signup arrives
+    signups.start()
+
+@app.after_serving
+async def close_clients():
+    await rpc.close()
+    await http.aclose()
+
+async def fetch_product(barcode_id: str):
+    # Local index, memory and Mongo tiers are shared with the sync server.
+    found, product = await asyncio.to_thread(lookup_cached, barcode_id)
+    if found:
+        return product
+    r = await http.get(OFF_PRODUCT_URL.format(barcode_id))
+    if r.status_code != 200:
+        return None
+    d = r.json()
+    product = d["product"] if d.get("status") == 1 else None
+    return await asyncio.to_thread(remember, barcode_id, product)
+
+async def hash_file(path: str):
+    # Recently checked digests come straight from memory; otherwise stat/rehash off the loop
+    return peek(path) or await asyncio.to_thread(file_sha256, path)
+
+def public_info(pubkey: str, doc: dict, points: int) -> dict:
+    # Same shape as wallet_manager_voting2.get_wallet_info
+    info = {k: v for k, v in doc.items() if k not in ("secret_key", "password_hash")}
+    info["pubkey"] = pubkey
+    info["points"] = points
+    return info
+
+@app.route("/signup", methods=["POST"])
+async def signup():
+    pk, pwd = await signups.signup_async()
+    return jsonify({"pubkey": pk, "password": pwd})
+
+@app.route("/signin", methods=["POST"])
+async def signin():
+    data = await request.get_json(silent=True) or {}
+    pk, pw = data.get("pubkey"), data.get("password")
+    token = request_token(data, request.headers)
+    if not pk or not (pw or token):
+        return jsonify({"error": "pubkey & password required"}), 400
+    doc = await wallets.find_one({"_id": pk}, projection("signin"))
+    if not doc:
+        return jsonify({"error": "wallet not found"}), 404
+    if not (token and check_token(token, pk)):
+        ok, rehash = await check_hash_async(doc["password_hash"], pw) if pw else (False, False)
+        if not ok:
+            return jsonify({"error": "invalid password"}), 403
+        if rehash:
+            await wallets.update_one({"_id": pk, "password_hash": doc["password_hash"]},
+                                     {"$set": {"password_hash": await hash_password_async(pw)}})
+    # Only a signed-in caller costs a ledger aggregate and an RPC
+    points, balance = await asyncio.gather(
+        asyncio.to_thread(get_points, pk),
+        get_owner_balance_async(pk, REWARD_MINT, rpc)
+    )
+    info = public_info(pk, doc, points)
+    return jsonify({
+        "wallet_info": info,
+        "points": info["points"],
+        "reward_balance": balance,
+        "session_token": issue_token(pk)
+    })
+
+@app.route("/signout", methods=["POST"])
+async def signout():
+    token = request_token(await request.get_json(silent=True) or {}, request.headers)
+    if token:
+        revoke(token)
+    return jsonify({"status": "signed out"})
+
+@app.route("/api/validate", methods=["POST"])
+async def validate_and_award_fixed_image():
+    form = await request.form
+
+    for field in ("barcode_id", "pubkey"):
+        if field not in form:
+            return jsonify({"error": f"Missing {field}"}), 400
+
+    barcode = form["barcode_id"]
+    pk      = form["pubkey"]
+
+    exists, prod, img_hash = await asyncio.gather(
+        wallets.count_documents({"_id": pk}, limit=1),
+        fetch_product(barcode),
+        hash_file(LOCAL_IMAGE_PATH)
+    )
+    if not exists:
+        return jsonify({"error": "wallet not found"}), 404
+    if not prod:
+        return jsonify({"error": "invalid barcode"}), 400
+    if img_hash is None:
+        return jsonify({"error": "local image not found"}), 500
+
+    score = prod.get("ecoscore_data", {}) \
+                .get("adjustments", {}) \
+                .get("packaging", {}) \
+                .get("value", 0)
+    pts   = map_score_to_points(score)
+
+    submission_id = hashlib.sha256(
+        f"{barcode}|{img_hash}|{datetime.utcnow().isoformat()}".encode()
+    ).hexdigest()
+    # The same barcode and photo from the same wallet only earns points once per window
+    claimed, earlier = await asyncio.to_thread(dedup.claim, barcode, img_hash, pk, submission_id)
+    if not claimed:
+        return jsonify({"error": "submission already claimed", "submission_id": earlier}), 409
+    try:
+        total_pts = await asyncio.to_thread(award_points, pk, pts, submission_id)
+    except FutureTimeout:
+        # Still queued in the award buffer and may yet be written, so the claim stays
+        return jsonify({
+            "status":         "pending",
+            "message":        "award is still being recorded",
+            "barcode_id":     barcode,
+            "image_hash":     img_hash,
+            "packaging_score": score,
+            "points_awarded": pts,
+            "submission_id":  submission_id
+        }), 202
+    except Exception:
+        await asyncio.to_thread(dedup.release, barcode, img_hash, pk, submission_id)
+        raise
+
+    return jsonify({
+        "status":         "success",
+        "barcode_id":     barcode,
+        "image_hash":     img_hash,
+        "packaging_score": score,
+        "points_awarded": pts,
+        "total_points":   total_pts,
+        "submission_id":  submission_id
+    })
+
+@app.route("/wallet/<pubkey>", methods=["GET"])
+async def wallet_info(pubkey):
+    doc, points, balance = await asyncio.gather(
+        wallets.find_one({"_id": pubkey}, projection("wallet")),
+        asyncio.to_thread(get_points, pubkey),
+        get_owner_balance_async(pubkey, REWARD_MINT, rpc, fresh=request.args.get("fresh") == "1")
+    )
+    if not doc:
+        return jsonify({"error": "wallet not found"}), 404
+    return jsonify({
+        "wallet_info": {
+            "pubkey": pubkey,
+            "password_hash": doc.get("password_hash"),
+            "points": points
+        },
+        "points": points,
+        "reward_balance": balance
+    })
+
+@app.route("/distribute", methods=["GET"])
+async def distribute_sol_by_points():
+    requested = request.args.get("epoch")
+
+    def queue():
+        check_policy(AIR_DROP_TOTAL_SOL)  # before the epoch is closed, not after
+        epoch = close_epoch(int(requested) if requested is not None else None)
+        return create_job(AIR_DROP_TOTAL_SOL, epoch)
+
+    try:
+        job, created = await asyncio.to_thread(queue)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    return jsonify({
+        "job_id": job["_id"],
+        "epoch": job["epoch"],
+        "status": job["status"],
+        "created": created,
+        "progress_url": f"/distribute/{job['_id']}"
+    }), 202 if created else 200
+
+@app.route("/distribute/<job_id>", methods=["GET"])
+async def distribute_progress(job_id):
+    progress = await asyncio.to_thread(job_progress, job_id)
+    if progress is None:
+        return jsonify({"error": "job not found"}), 404
+    return jsonify(progress)
+
+@app.route("/total", methods=["GET"])
+async def total_supply():
+    resp = await rpc.get_token_supply(Pubkey.from_string(REWARD_MINT))
+    if not resp or not resp.value:
+        return jsonify({"error": "could not fetch supply"}), 500
+    amount = int(resp.value.amount)
+    decimals = resp.value.decimals
+    return jsonify({
+        "mint": REWARD_MINT,
+        "amount_raw": amount,
+        "decimals": decimals,
+        "amount": amount / (10 ** decimals)
+    })
+
+@app.route("/stats", methods=["GET"])
+async def stats():
+    return jsonify({
+        "product_cache": cache_stats(),
+        "balance_cache": balance_cache_stats(),
+        "award_buffer": awards.stats(),
+        "signup_pool": signups.stats(),
+        "file_hashes": file_hash_stats(),
+        "submission_dedup": dedup.stats()
+    })
+
+if __name__ == "__main__":
+    app.run(port=8888)
@@ -0,0 +1,185 @@
+"""
+signup_pool.py
+
+Fast /signup for the voting2 servers. Background threads keep a pool of
+ready-made wallets (keypair, password and the password's scrypt hash) topped
+up to SIGNUP_POOL_DEPTH entries, so a signup only pops one and stores it.
+
+Stores are batched like award_buffer: wallets queued within SIGNUP_FLUSH_MS
+of each other, up to SIGNUP_FLUSH_SIZE of them, are written with one
+insert_many, and each signup returns once its own wallet is stored. When a
+burst drains the pool, signups build their wallet inline (counted as misses
+in stats()) while the refill threads catch up.
+
+No thread starts at import. The pool starts filling on the first signup, or
+when a server calls signups.start() as it begins serving.
+"""
+
+import asyncio
+import os
+import queue
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future
+
+from pymongo.errors import BulkWriteError
+
+import auth
+from walletGenVoting2 import generate_wallet
+from wallet_manager_voting2 import col
+
+SIGNUP_POOL_DEPTH   = int(os.environ.get("SIGNUP_POOL_DEPTH", 2000))
+SIGNUP_POOL_WORKERS = int(os.environ.get("SIGNUP_POOL_WORKERS", 2))
+SIGNUP_FLUSH_MS     = float(os.environ.get("SIGNUP_FLUSH_MS", 5))
+SIGNUP_FLUSH_SIZE   = int(os.environ.get("SIGNUP_FLUSH_SIZE", 500))
+SIGNUP_TIMEOUT      = 10.0
+RATE_WINDOW         = 60.0  # seconds over which refill_per_sec is measured
+
+def _wallet_doc(pubkey: str, secret_key: list, password_hash: str) -> dict:
+    return {"_id": pubkey, "secret_key": secret_key, "password_hash": password_hash}
+
+class SignupPool:
+    """Pre-generated wallets plus a batching writer for the wallets collection."""
+
+    def __init__(self, col, depth: int = SIGNUP_POOL_DEPTH, workers: int = SIGNUP_POOL_WORKERS,
+                 flush_ms: float = SIGNUP_FLUSH_MS, max_batch: int = SIGNUP_FLUSH_SIZE):
+        self.col = col
+        self.depth = depth
+        self.workers = workers
+        self.flush_interval = flush_ms / 1000
+        self.max_batch = max_batch
+        self._ready = queue.Queue(maxsize=depth)  # (doc, password)
+        self._pending = []  # [(doc, future, queued_at)]
+        self._cond = threading.Condition()
+        self._lock = threading.Lock()  # counters
+        self._started = False
+        self._refills = deque()  # monotonic time of each refill within RATE_WINDOW
+        self._generated = 0
+        self._taken = 0
+        self._misses = 0
+        self._batches = 0
+        self._stored = 0
+
+    def start(self):
+        """Start the refill and writer threads; later calls do nothing."""
+        with self._lock:
+            if self._started:
+                return
+            self._started = True
+        for i in range(self.workers):
+            threading.Thread(target=self._refill, name=f"signup-refill-{i}", daemon=True).start()
+        threading.Thread(target=self._run, name="signup-writer", daemon=True).start()
+
+    def _refill(self):
+        while True:
+            pk, sk, pwd = generate_wallet()
+            # make_hash directly: the refill threads are the pool's own KDF
+            # workers, so a refill never queues behind sign-ins.
+            self._ready.put((_wallet_doc(pk, sk, auth.make_hash(pwd)), pwd))  # blocks while full
+            now = time.monotonic()
+            with self._lock:
+                self._generated += 1
+                self._refills.append(now)
+                while now - self._refills[0] > RATE_WINDOW:
+                    self._refills.popleft()
+
+    def _pop(self):
+        try:
+            entry = self._ready.get_nowait()
+        except queue.Empty:
+            entry = None
+        with self._lock:
+            if entry is None:
+                self._misses += 1
+            else:
+                self._taken += 1
+        return entry
+
+    def _queue(self, doc: dict) -> Future:
+        fut = Future()
+        with self._cond:
+            self._pending.append((doc, fut, time.monotonic()))
+            if len(self._pending) == 1 or len(self._pending) >= self.max_batch:
+                self._cond.notify()
+        return fut
+
+    def signup(self):
+        """Create and store a new wallet; returns (pubkey, password)."""
+        self.start()
+        entry = self._pop()
+        if entry is None:
+            pk, sk, pwd = generate_wallet()
+            entry = (_wallet_doc(pk, sk, auth.hash_password(pwd)), pwd)
+        doc, pwd = entry
+        self._queue(doc).result(timeout=SIGNUP_TIMEOUT)
+        return doc["_id"], pwd
+
+    async def signup_async(self):
+        """signup() without holding a thread while the wallet is hashed or stored."""
+        self.start()
+        entry = self._pop()
+        if entry is None:
+            pk, sk, pwd = generate_wallet()
+            entry = (_wallet_doc(pk, sk, await auth.hash_password_async(pwd)), pwd)
+        doc, pwd = entry
+        await asyncio.wait_for(asyncio.wrap_future(self._queue(doc)), SIGNUP_TIMEOUT)
+        return doc["_id"], pwd
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while not self._pending:
+                    self._cond.wait()
+                deadline = self._pending[0][2] + self.flush_interval
+                while len(self._pending) < self.max_batch:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    self._cond.wait(remaining)
+                batch = self._pending[:self.max_batch]
+                self._pending = self._pending[self.max_batch:]
+            try:
+                self._flush(batch)
+            except Exception as e:
+                for _, fut, _ in batch:
+                    if not fut.done():
+                        fut.set_exception(e)
+
+    def _flush(self, batch: list):
+        failed = {}  # index -> error
+        try:
+            self.col.insert_many([doc for doc, _, _ in batch], ordered=False)
+        except BulkWriteError as e:
+            for err in e.details["writeErrors"]:
+                failed[err["index"]] = err["errmsg"]
+        with self._lock:
+            self._batches += 1
+            self._stored += len(batch) - len(failed)
+        for i, (_, fut, _) in enumerate(batch):
+            if i in failed:
+                fut.set_exception(RuntimeError(failed[i]))
+            else:
+                fut.set_result(None)
+
+    def stats(self) -> dict:
+        now = time.monotonic()
+        with self._cond:
+            queued = len(self._pending)
+        with self._lock:
+            recent = sum(1 for t in self._refills if now - t <= RATE_WINDOW)
+            return {
+                "depth": self._ready.qsize(),
+                "target_depth": self.depth,
+                "workers": self.workers,
+                "refill_per_sec": round(recent / RATE_WINDOW, 2),
+                "generated": self._generated,
+                "taken": self._taken,
+                "misses": self._misses,
+                "batches": self._batches,
+                "stored": self._stored,
+                "signups_per_batch": round(self._stored / self._batches, 2) if self._batches else 0.0,
+                "queued": queued,
+            }
+
+signups = SignupPool(col)
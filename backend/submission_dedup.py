@@ -0,0 +1,186 @@
+"""
+submission_dedup.py
+
+Stops the same proof from being rewarded twice. A submission is identified
+by its content, sha256(barcode | image_hash | pubkey), and can be claimed
+once per SUBMISSION_DEDUP_WINDOW seconds.
+
+  • The `submission_claims` collection is the source of truth. A claim is an
+    insert on the content key (its _id), so two racing requests cannot both
+    win. A TTL index on created_at drops claims once the window has passed.
+  • An in-process Bloom filter of the keys claimed recently answers most
+    "already claimed?" questions without a round-trip. A key that is not in
+    the filter goes straight to the insert. Only a key that is in the filter
+    is looked up in Mongo first, to tell a real duplicate from a false
+    positive (about SUBMISSION_BLOOM_ERROR_RATE of new keys).
+  • The filter has two generations, each covering one window, and the older
+    one is dropped at every rotation. Memory therefore stays at two filters
+    of SUBMISSION_BLOOM_CAPACITY keys each, however long the history is.
+    Claims made by other processes are not in this process's filter, but
+    their insert still collides on _id, so they are caught all the same.
+"""
+
+import hashlib
+import math
+import os
+import threading
+import time
+from datetime import datetime, timedelta
+
+from pymongo import ASCENDING, MongoClient
+from pymongo.errors import DuplicateKeyError, OperationFailure
+
+DEDUP_WINDOW     = int(os.environ.get("SUBMISSION_DEDUP_WINDOW", 24 * 3600))
+BLOOM_CAPACITY   = int(os.environ.get("SUBMISSION_BLOOM_CAPACITY", 10_000_000))
+BLOOM_ERROR_RATE = float(os.environ.get("SUBMISSION_BLOOM_ERROR_RATE", 0.01))
+
+client = MongoClient("mongodb://localhost:27017/")
+db     = client["sasehacks"]
+claims = db["submission_claims"]
+
+_indexes_ready = False
+
+def _ensure_indexes():
+    global _indexes_ready
+    if not _indexes_ready:
+        try:
+            claims.create_index([("created_at", ASCENDING)], expireAfterSeconds=DEDUP_WINDOW)
+        except OperationFailure:
+            # Window changed since the index was built
+            db.command("collMod", claims.name,
+                       index={"keyPattern": {"created_at": 1}, "expireAfterSeconds": DEDUP_WINDOW})
+        _indexes_ready = True
+
+class BloomFilter:
+    def __init__(self, capacity: int, error_rate: float):
+        self.m = max(8, math.ceil(-capacity * math.log(error_rate) / math.log(2) ** 2))
+        self.k = max(1, round(self.m / capacity * math.log(2)))
+        self.bits = bytearray((self.m + 7) // 8)
+
+    def _positions(self, digest: bytes):
+        # Double hashing over two independent 64-bit slices of a SHA-256 digest
+        h1 = int.from_bytes(digest[:8], "little")
+        h2 = int.from_bytes(digest[8:16], "little") | 1
+        return [(h1 + i * h2) % self.m for i in range(self.k)]
+
+    def add(self, digest: bytes):
+        for p in self._positions(digest):
+            self.bits[p >> 3] |= 1 << (p & 7)
+
+    def __contains__(self, digest: bytes) -> bool:
+        return all(self.bits[p >> 3] & (1 << (p & 7)) for p in self._positions(digest))
+
+class SubmissionDedup:
+    def __init__(self, window: float = DEDUP_WINDOW, capacity: int = BLOOM_CAPACITY,
+                 error_rate: float = BLOOM_ERROR_RATE):
+        self.window = window
+        self.capacity = capacity
+        self.error_rate = error_rate
+        self._lock = threading.Lock()
+        self._current = BloomFilter(capacity, error_rate)
+        self._previous = BloomFilter(capacity, error_rate)
+        self._rotated_at = time.monotonic()
+        self._warm = False
+        self._warming = False
+        self._counters = {"claimed": 0, "duplicates": 0, "bloom_negatives": 0,
+                          "bloom_false_positives": 0}
+
+    @staticmethod
+    def key(barcode: str, image_hash: str, pubkey: str) -> bytes:
+        return hashlib.sha256(f"{barcode}|{image_hash}|{pubkey}".encode()).digest()
+
+    def _rotate(self):
+        if time.monotonic() - self._rotated_at >= self.window:
+            with self._lock:
+                if time.monotonic() - self._rotated_at >= self.window:
+                    self._previous = self._current
+                    self._current = BloomFilter(self.capacity, self.error_rate)
+                    self._rotated_at = time.monotonic()
+
+    def _remember(self, digest: bytes):
+        with self._lock:
+            self._current.add(digest)
+
+    def _warm_up(self):
+        """Load claims still inside the window, so a restart keeps the fast negative path."""
+        try:
+            for doc in claims.find({}, {"_id": 1}, batch_size=10_000):
+                self._remember(bytes.fromhex(doc["_id"]))
+            self._warm = True
+        finally:
+            self._warming = False
+
+    def _start_warm_up(self):
+        with self._lock:
+            if self._warm or self._warming:
+                return
+            self._warming = True
+        threading.Thread(target=self._warm_up, name="dedup-warmup", daemon=True).start()
+
+    def maybe_claimed(self, digest: bytes) -> bool:
+        """False means definitely not claimed by this process in the window. No I/O."""
+        self._rotate()
+        if not self._warm:
+            self._start_warm_up()
+            return True
+        return digest in self._current or digest in self._previous
+
+    def _count(self, name: str):
+        with self._lock:
+            self._counters[name] += 1
+
+    def claim(self, barcode: str, image_hash: str, pubkey: str, submission_id: str):
+        """
+        Claim a submission before any points are written. Returns (True, None)
+        if it is new, or (False, <submission_id of the earlier claim>) if the
+        same proof was already claimed within the window.
+        """
+        _ensure_indexes()
+        digest = self.key(barcode, image_hash, pubkey)
+        _id = digest.hex()
+        now = datetime.utcnow()
+        cutoff = now - timedelta(seconds=self.window)
+
+        if self.maybe_claimed(digest):
+            doc = claims.find_one({"_id": _id}, {"submission_id": 1, "created_at": 1})
+            if doc and doc["created_at"] > cutoff:
+                self._count("duplicates")
+                self._remember(digest)
+                return False, doc.get("submission_id")
+            self._count("bloom_false_positives")
+        else:
+            self._count("bloom_negatives")
+
+        try:
+            claims.insert_one({"_id": _id, "submission_id": submission_id, "created_at": now})
+        except DuplicateKeyError:
+            # Claimed meanwhile, or an expired claim the TTL monitor has not removed yet
+            taken = claims.update_one(
+                {"_id": _id, "created_at": {"$lte": cutoff}},
+                {"$set": {"submission_id": submission_id, "created_at": now}}
+            )
+            if not taken.modified_count:
+                doc = claims.find_one({"_id": _id}, {"submission_id": 1})
+                self._count("duplicates")
+                self._remember(digest)
+                return False, doc.get("submission_id") if doc else None
+        self._count("claimed")
+        self._remember(digest)
+        return True, None
+
+    def release(self, barcode: str, image_hash: str, pubkey: str, submission_id: str):
+        """Undo a claim whose award failed, so the proof can be resubmitted."""
+        _id = self.key(barcode, image_hash, pubkey).hex()
+        claims.delete_one({"_id": _id, "submission_id": submission_id})
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                **self._counters,
+                "window_s": self.window,
+                "warm": self._warm,
+                "bloom_bits": self._current.m,
+                "bloom_hashes": self._current.k,
+            }
+
+dedup = SubmissionDedup()
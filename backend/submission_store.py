@@ -0,0 +1,104 @@
+"""
+submission_store.py
+
+Persistent store for the proofs recorded by app.py, in SQLite
+(SUBMISSIONS_DB_PATH). Submissions are indexed by id, by wallet and by
+barcode. The autoincrement `seq` column gives the time order and is the
+pagination cursor, so every lookup or page is an index probe or range scan.
+"""
+
+import os
+import sqlite3
+import threading
+from datetime import datetime, timezone
+
+DB_PATH    = os.environ.get("SUBMISSIONS_DB_PATH", "submissions.db")
+PAGE_SIZE  = int(os.environ.get("SUBMISSIONS_PAGE_SIZE", 50))
+PAGE_MAX   = int(os.environ.get("SUBMISSIONS_PAGE_MAX", 200))
+
+FIELDS = ("id", "barcode_id", "image_hash", "combined_hash", "image_phash",
+          "wallet_address", "timestamp", "status", "tokens_minted")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS submissions (
+    seq            INTEGER PRIMARY KEY AUTOINCREMENT,
+    id             TEXT NOT NULL UNIQUE,
+    barcode_id     TEXT NOT NULL,
+    image_hash     TEXT NOT NULL,
+    combined_hash  TEXT,
+    image_phash    TEXT,
+    wallet_address TEXT,
+    timestamp      TEXT NOT NULL,
+    status         TEXT,
+    tokens_minted  INTEGER
+);
+CREATE INDEX IF NOT EXISTS submissions_by_wallet  ON submissions (wallet_address, seq);
+CREATE INDEX IF NOT EXISTS submissions_by_barcode ON submissions (barcode_id, seq);
+CREATE INDEX IF NOT EXISTS submissions_by_time    ON submissions (timestamp, seq);
+"""
+
+_local = threading.local()
+
+def _connection() -> sqlite3.Connection:
+    conn = getattr(_local, "conn", None)
+    if conn is None:
+        conn = sqlite3.connect(DB_PATH, timeout=30)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.executescript(SCHEMA)
+        _local.conn = conn
+    return conn
+
+def _to_dict(row) -> dict:
+    return dict(zip(FIELDS, row))
+
+def parse_since(value: str) -> str:
+    """Normalise an ISO-8601 time to the naive-UTC form submissions are stamped with."""
+    ts = datetime.fromisoformat(value.replace("Z", "+00:00"))
+    if ts.tzinfo is not None:
+        ts = ts.astimezone(timezone.utc).replace(tzinfo=None)
+    return ts.isoformat()
+
+def add(submission: dict):
+    conn = _connection()
+    with conn:
+        conn.execute(
+            f"INSERT INTO submissions ({', '.join(FIELDS)}) VALUES ({', '.join('?' * len(FIELDS))})",
+            tuple(submission.get(f) for f in FIELDS)
+        )
+
+def get(submission_id: str):
+    row = _connection().execute(
+        f"SELECT {', '.join(FIELDS)} FROM submissions WHERE id = ?", (submission_id,)
+    ).fetchone()
+    return _to_dict(row) if row else None
+
+def page(wallet: str = None, barcode: str = None, since: str = None,
+         cursor: int = None, limit: int = PAGE_SIZE):
+    """
+    Newest-first page of submissions matching the filters. `since` is a
+    normalised timestamp (see parse_since). Returns (items, next_cursor);
+    next_cursor is None on the last page.
+    """
+    limit = max(1, min(limit, PAGE_MAX))
+    where, args = [], []
+    if wallet is not None:
+        where.append("wallet_address = ?")
+        args.append(wallet)
+    if barcode is not None:
+        where.append("barcode_id = ?")
+        args.append(barcode)
+    if since is not None:
+        # seq follows stamp order, so `since` becomes a seq bound found via the time index
+        where.append("seq >= (SELECT seq FROM submissions WHERE timestamp >= ? ORDER BY timestamp, seq LIMIT 1)")
+        args.append(since)
+    if cursor is not None:
+        where.append("seq < ?")
+        args.append(cursor)
+    sql = f"SELECT seq, {', '.join(FIELDS)} FROM submissions"
+    if where:
+        sql += " WHERE " + " AND ".join(where)
+    sql += " ORDER BY seq DESC LIMIT ?"
+    rows = _connection().execute(sql, (*args, limit + 1)).fetchall()
+    next_cursor = rows[limit - 1][0] if len(rows) > limit else None
+    return [_to_dict(r[1:]) for r in rows[:limit]], next_cursor
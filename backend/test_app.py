@@ -0,0 +1,68 @@
+"""
+Route tests for app.py: a proof posted to /api/proof is stored and listed.
+
+    python -m pytest test_app.py
+"""
+
+import io
+import os
+import sqlite3
+import tempfile
+
+import numpy as np
+from PIL import Image
+
+# The stores read their paths at import, so point them at a scratch directory first
+_tmp = tempfile.mkdtemp()
+os.environ["SUBMISSIONS_DB_PATH"] = os.path.join(_tmp, "submissions.db")
+os.environ["PHASH_INDEX_PATH"] = os.path.join(_tmp, "phash_index.db")
+
+import submission_store  # noqa: E402
+from app import app  # noqa: E402
+
+def _photo(seed: int) -> io.BytesIO:
+    pixels = (np.random.default_rng(seed).random((24, 32, 3)) * 255).astype(np.uint8)
+    buf = io.BytesIO()
+    Image.fromarray(pixels).resize((640, 480)).save(buf, "JPEG")
+    buf.seek(0)
+    return buf
+
+def _post_proof(client, barcode: str, wallet: str, seed: int):
+    return client.post("/api/proof", data={
+        "barcode_id": barcode,
+        "wallet_address": wallet,
+        "image": (_photo(seed), "proof.jpg"),
+    }, content_type="multipart/form-data")
+
+def test_posted_proof_is_listed():
+    client = app.test_client()
+    resp = _post_proof(client, "3017620422003", "wallet-a", seed=1)
+    assert resp.status_code == 200, resp.get_json()
+    tx_id = resp.get_json()["transaction_id"]
+
+    listed = client.get("/api/submissions?wallet=wallet-a").get_json()
+    assert [s["id"] for s in listed["submissions"]] == [tx_id]
+    assert listed["submissions"][0]["barcode_id"] == "3017620422003"
+    assert listed["next_cursor"] is None
+
+    one = client.get(f"/api/submissions/{tx_id}").get_json()
+    assert one["submission"]["tokens_minted"] == 10
+
+def test_similar_photo_is_rejected():
+    client = app.test_client()
+    assert _post_proof(client, "5449000000996", "wallet-b", seed=2).status_code == 200
+    resp = _post_proof(client, "5449000000996", "wallet-c", seed=2)
+    assert resp.status_code == 409
+    listed = client.get("/api/submissions?wallet=wallet-c").get_json()
+    assert listed["count"] == 0
+
+def test_photo_is_released_when_the_store_fails(monkeypatch):
+    client = app.test_client()
+
+    def busy(submission):
+        raise sqlite3.OperationalError("database is locked")
+
+    monkeypatch.setattr(submission_store, "add", busy)
+    assert _post_proof(client, "8000500310427", "wallet-d", seed=3).status_code == 500
+    monkeypatch.undo()
+    assert _post_proof(client, "8000500310427", "wallet-d", seed=3).status_code == 200
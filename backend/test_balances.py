@@ -0,0 +1,50 @@
+"""
+Tests for the batched balance lookups in balances.py, against a fake RPC client.
+
+    python -m pytest test_balances.py
+"""
+
+from types import SimpleNamespace
+
+from solders.keypair import Keypair
+from solders.pubkey import Pubkey
+from spl.token.instructions import get_associated_token_address
+
+import balances
+
+MINT = str(Keypair().pubkey())
+
+class FakeClient:
+    """Answers getMultipleAccounts from a {ata: amount} map and records each call."""
+
+    def __init__(self, amounts: dict):
+        self.amounts = amounts
+        self.calls = []
+
+    def get_multiple_accounts(self, pubkeys, data_slice=None):
+        self.calls.append((list(pubkeys), data_slice))
+        value = [SimpleNamespace(data=self.amounts[pk].to_bytes(8, "little")) if pk in self.amounts else None
+                 for pk in pubkeys]
+        return SimpleNamespace(value=value)
+
+def _ata(owner: str):
+    return get_associated_token_address(Pubkey.from_string(owner), Pubkey.from_string(MINT))
+
+def test_get_owner_balances_batches_ata_reads(monkeypatch):
+    owners = [str(Keypair().pubkey()) for _ in range(250)]
+    # Every other owner has an ATA; the rest have never received the token
+    amounts = {_ata(pk): 1000 + i for i, pk in enumerate(owners) if i % 2 == 0}
+    client = FakeClient(amounts)
+    monkeypatch.setattr(balances, "get_client", lambda endpoint: client)
+
+    result = balances.get_owner_balances(owners, MINT)
+
+    assert result == {pk: 1000 + i if i % 2 == 0 else 0 for i, pk in enumerate(owners)}
+    assert [len(atas) for atas, _ in client.calls] == [100, 100, 50]
+    assert all(data_slice == balances.AMOUNT_SLICE for _, data_slice in client.calls)
+
+def test_get_owner_balances_of_nobody_makes_no_call(monkeypatch):
+    client = FakeClient({})
+    monkeypatch.setattr(balances, "get_client", lambda endpoint: client)
+    assert balances.get_owner_balances([], MINT) == {}
+    assert client.calls == []
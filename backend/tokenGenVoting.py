@@ -1,30 +1,33 @@
 # tokenGenvoting.py
-import json
-from solana.rpc.api import Client
-from spl.token.client import Token
-from spl.token.constants import TOKEN_PROGRAM_ID
 from spl.token.instructions import get_associated_token_address
 from solana.rpc.types import TxOpts
 from solders.pubkey import Pubkey
-from solders.keypair import Keypair
+
+from authority import keypair_from_file, signers
+from balances import get_owner_balance, get_owner_balances, invalidate
+from rpc_pool import get_token
 
 LOCAL_RPC = "http://127.0.0.1:8899"
 PRIMARY_MINT = "BF1WUaksg6FkFGwDYeztCLvCT9Lwywu6MgvQpYdADpzo"
 REWARD_MINT  = "Fc6JFBpVDYmWRKtDxx2keGrne3uWFSMYSvTxYFJDiZ7T"
 MINT_AUTH_PUBKEY = "7bS2Vfj9p2Nuz6sgEqtpsMCRqzWRRFo24Xv2M5db7EA3"
 
-def load_authority():
-    with open("reward-wallet.json", "r") as f:
-        secret = json.load(f)
-    wallet = Keypair.from_bytes(bytes(secret))
+MINT_AUTHORITY_FILE = "reward-wallet.json"
+
+def _load_authority_from_file():
+    wallet = keypair_from_file(MINT_AUTHORITY_FILE)()
     print("🔍 Loaded mint authority pubkey:", wallet.pubkey())
     return wallet
 
+signers.register(PRIMARY_MINT, _load_authority_from_file)
+signers.register(REWARD_MINT, _load_authority_from_file)
+
+def load_authority(mint_address: str = REWARD_MINT):
+    return signers.get(mint_address)
+
 def mint_spl_token(pubkey_str: str, amount: int, mint_address: str) -> str:
-    auth = load_authority()
-    client = Client(LOCAL_RPC)
-    token = Token(conn=client, pubkey=Pubkey.from_string(mint_address),
-                  program_id=TOKEN_PROGRAM_ID, payer=auth)
+    auth = load_authority(mint_address)
+    token = get_token(mint_address, auth, LOCAL_RPC)
     user_pubkey = Pubkey.from_string(pubkey_str)
     ata = get_associated_token_address(user_pubkey, token.pubkey)
     try:
@@ -32,6 +35,7 @@ def mint_spl_token(pubkey_str: str, amount: int, mint_address: str) -> str:
     except Exception:
         token.create_associated_token_account(user_pubkey)
     resp = token.mint_to(ata, auth, amount, opts=TxOpts(skip_preflight=False, preflight_commitment="confirmed"))
+    invalidate(pubkey_str, mint_address)
     return str(resp.value)
 
 def mint_primary(pubkey_str: str, amount: int) -> str:
@@ -40,19 +44,15 @@ def mint_primary(pubkey_str: str, amount: int) -> str:
 def mint_reward(pubkey_str: str, amount: int) -> str:
     return mint_spl_token(pubkey_str, amount, REWARD_MINT)
 
-def get_spl_balance(pubkey_str: str, mint_address: str) -> int:
-    auth = load_authority()
-    client = Client(LOCAL_RPC)
-    token = Token(conn=client, pubkey=Pubkey.from_string(mint_address),
-                  program_id=TOKEN_PROGRAM_ID, payer=auth)
-    total = 0
-    for acct in token.get_accounts_by_owner(Pubkey.from_string(pubkey_str)).value:
-        bal = client.get_token_account_balance(Pubkey.from_string(str(acct.pubkey)))
-        total += int(bal.value.amount)
-    return total
-
-def get_primary_balance(pubkey_str: str) -> int:
-    return get_spl_balance(pubkey_str, PRIMARY_MINT)
-
-def get_reward_balance(pubkey_str: str) -> int:
-    return get_spl_balance(pubkey_str, REWARD_MINT)
+def get_spl_balance(pubkey_str: str, mint_address: str, fresh: bool = False) -> int:
+    return get_owner_balance(pubkey_str, mint_address, LOCAL_RPC, fresh=fresh)
+
+def get_primary_balance(pubkey_str: str, fresh: bool = False) -> int:
+    return get_spl_balance(pubkey_str, PRIMARY_MINT, fresh)
+
+def get_reward_balance(pubkey_str: str, fresh: bool = False) -> int:
+    return get_spl_balance(pubkey_str, REWARD_MINT, fresh)
+
+def get_reward_balances(pubkeys: list) -> dict:
+    """Reward balance of many owners, 100 ATAs per getMultipleAccounts call."""
+    return get_owner_balances(pubkeys, REWARD_MINT, LOCAL_RPC)
@@ -1,9 +1,9 @@
-from solana.rpc.api import Client
-from spl.token.client import Token
-from spl.token.constants import TOKEN_PROGRAM_ID
 from solana.rpc.types import TxOpts
 from solders.pubkey import Pubkey
 
+from authority import signers
+from balances import get_owner_balance, get_owner_balances, invalidate
+from rpc_pool import get_token
 from wallet_manager_voting2 import load_keypair_from_db
 
 # Configuration
@@ -15,20 +15,20 @@ REWARD_MINT = "F7bcyQmc6WCinDdF1eLN81qJbW88wUb1N9zJP9WHEt9B"
 
 # Shyam pubkey- F7bcyQmc6WCinDdF1eLN81qJbW88wUb1N9zJP9WHEt9B
 
-def load_authority():
+def _load_authority_from_db():
     auth = load_keypair_from_db(MINT_AUTH_PUBKEY)
     if auth is None:
         raise RuntimeError(f"Mint authority {MINT_AUTH_PUBKEY} not found in MongoDB")
     return auth
 
+signers.register(REWARD_MINT, _load_authority_from_db)
+
+def load_authority():
+    # Loaded from Mongo once; use signers.reload()/rotate() to pick up a new key.
+    return signers.get(REWARD_MINT)
+
 def get_token_client(mint_address: str, authority):
-    client = Client(LOCAL_RPC)
-    return Token(
-        conn=client,
-        pubkey=Pubkey.from_string(mint_address),
-        program_id=TOKEN_PROGRAM_ID,
-        payer=authority
-    )
+    return get_token(mint_address, authority, LOCAL_RPC)
 
 def mint_spl_token(pubkey_str: str, amount: int, mint_address: str) -> str:
     auth = load_authority()
@@ -41,16 +41,14 @@ def mint_spl_token(pubkey_str: str, amount: int, mint_address: str) -> str:
         amount=amount,
         opts=TxOpts(skip_preflight=False, preflight_commitment="confirmed")
     )
+    invalidate(pubkey_str, mint_address)
     return str(resp.value)
 
 def mint_reward(pubkey_str: str, amount: int) -> str:
     return mint_spl_token(pubkey_str, amount, REWARD_MINT)
 
-def get_reward_balance(pubkey_str: str) -> int:
-    auth = load_authority()
-    token = get_token_client(REWARD_MINT, auth)
-    total = 0
-    for acct in token.get_accounts_by_owner(Pubkey.from_string(pubkey_str)).value:
-        bal = token._conn.get_token_account_balance(Pubkey.from_string(str(acct.pubkey)))
-        total += int(bal.value.amount)
-    return total
+def get_reward_balance(pubkey_str: str, fresh: bool = False) -> int:
+    return get_owner_balance(pubkey_str, REWARD_MINT, LOCAL_RPC, fresh=fresh)
+
+def get_reward_balances(pubkeys: list) -> dict:
+    return get_owner_balances(pubkeys, REWARD_MINT, LOCAL_RPC)
@@ -0,0 +1,84 @@
+import threading
+import time
+from collections import OrderedDict
+
+MISSING = object()
+
+class TTLCache:
+    """
+    Thread-safe LRU cache whose entries expire `ttl` seconds after they are stored.
+    Entries older than `ttl` but younger than `ttl + stale_ttl` are still returned
+    by lookup(), flagged as stale, so callers can serve them while refreshing.
+    """
+
+    def __init__(self, max_size: int = 1024, ttl: float = 60.0, stale_ttl: float = 0.0):
+        self.max_size = max_size
+        self.ttl = ttl
+        self.stale_ttl = stale_ttl
+        self._entries = OrderedDict()  # key -> (value, fresh_until, stale_until)
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.stale_hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def lookup(self, key):
+        """Return (value, is_stale); value is MISSING when there is no usable entry."""
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return MISSING, False
+            value, fresh_until, stale_until = entry
+            if now >= stale_until:
+                del self._entries[key]
+                self.expirations += 1
+                self.misses += 1
+                return MISSING, False
+            self._entries.move_to_end(key)
+            if now >= fresh_until:
+                self.stale_hits += 1
+                return value, True
+            self.hits += 1
+            return value, False
+
+    def get(self, key, default=None):
+        value, _ = self.lookup(key)
+        return default if value is MISSING else value
+
+    def set(self, key, value, ttl: float = None):
+        ttl = self.ttl if ttl is None else ttl
+        now = time.monotonic()
+        with self._lock:
+            self._entries[key] = (value, now + ttl, now + ttl + self.stale_ttl)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def pop(self, key):
+        with self._lock:
+            return self._entries.pop(key, (MISSING,))[0]
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.stale_hits + self.misses
+            return {
+                "size": len(self._entries),
+                "max_size": self.max_size,
+                "hits": self.hits,
+                "stale_hits": self.stale_hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+                "hit_rate": (self.hits + self.stale_hits) / lookups if lookups else 0.0,
+            }
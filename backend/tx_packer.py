@@ -0,0 +1,107 @@
+"""
+tx_packer.py
+
+Packs reward mints for many recipients into as few transactions as fit the
+1232-byte packet limit. Each recipient contributes an idempotent
+create-associated-token-account instruction and a mint_to, so a transaction
+never fails because an ATA already exists. Packed transactions are signed by
+the mint authority and submitted concurrently.
+"""
+
+from concurrent.futures import ThreadPoolExecutor
+
+from solana.rpc.types import TxOpts
+from solders.instruction import AccountMeta, Instruction
+from solders.message import Message
+from solders.pubkey import Pubkey
+from solders.system_program import ID as SYS_PROGRAM_ID
+from solders.transaction import Transaction
+from spl.token.constants import ASSOCIATED_TOKEN_PROGRAM_ID, TOKEN_PROGRAM_ID
+from spl.token.instructions import MintToParams, get_associated_token_address, mint_to
+
+from distribution import DISTRIBUTE_RPS, DISTRIBUTE_WORKERS, RateLimiter, with_retries
+
+PACKET_DATA_SIZE = 1232
+SIGNATURE_SIZE = 64
+
+def create_ata_idempotent(payer: Pubkey, owner: Pubkey, mint: Pubkey) -> Instruction:
+    """Associated Token Account program `CreateIdempotent` (instruction index 1)."""
+    return Instruction(
+        ASSOCIATED_TOKEN_PROGRAM_ID,
+        bytes([1]),
+        [
+            AccountMeta(payer, True, True),
+            AccountMeta(get_associated_token_address(owner, mint), False, True),
+            AccountMeta(owner, False, False),
+            AccountMeta(mint, False, False),
+            AccountMeta(SYS_PROGRAM_ID, False, False),
+            AccountMeta(TOKEN_PROGRAM_ID, False, False),
+        ],
+    )
+
+def recipient_instructions(authority: Pubkey, mint: Pubkey, owner_str: str, amount: int) -> list:
+    owner = Pubkey.from_string(owner_str)
+    return [
+        create_ata_idempotent(authority, owner, mint),
+        mint_to(MintToParams(
+            program_id=TOKEN_PROGRAM_ID,
+            mint=mint,
+            dest=get_associated_token_address(owner, mint),
+            mint_authority=authority,
+            amount=amount,
+        )),
+    ]
+
+def transaction_size(instructions: list, payer: Pubkey) -> int:
+    # One signer (the authority pays and signs): shortvec(1) + signature + message
+    return 1 + SIGNATURE_SIZE + len(bytes(Message(instructions, payer)))
+
+def pack(allocations: dict, authority: Pubkey, mint_address: str) -> list:
+    """
+    Greedily group {owner: amount} into batches whose transaction fits in one
+    packet. Returns [(owners, instructions), ...].
+    """
+    mint = Pubkey.from_string(mint_address)
+    batches = []
+    owners, ixs = [], []
+    for owner, amount in allocations.items():
+        if amount <= 0:
+            continue
+        extra = recipient_instructions(authority, mint, owner, amount)
+        if ixs and transaction_size(ixs + extra, authority) > PACKET_DATA_SIZE:
+            batches.append((owners, ixs))
+            owners, ixs = [], []
+        owners.append(owner)
+        ixs.extend(extra)
+    if ixs:
+        batches.append((owners, ixs))
+    return batches
+
+def mint_packed(client, authority, mint_address: str, allocations: dict,
+                workers: int = DISTRIBUTE_WORKERS, rate: float = DISTRIBUTE_RPS) -> dict:
+    """
+    Mint {owner: amount} of `mint_address` using packed transactions signed
+    by `authority`. Returns {owner: {"signature": ...} or {"error": ...}}.
+    """
+    batches = pack(allocations, authority.pubkey(), mint_address)
+    blockhash = client.get_latest_blockhash().value.blockhash
+    opts = TxOpts(skip_preflight=False, preflight_commitment="confirmed")
+    limiter = RateLimiter(rate)
+
+    def send(ixs):
+        msg = Message.new_with_blockhash(ixs, authority.pubkey(), blockhash)
+        tx = Transaction([authority], msg, blockhash)
+        # Resending the same signed transaction is idempotent.
+        return str(with_retries(lambda: client.send_raw_transaction(bytes(tx), opts=opts), limiter).value)
+
+    results = {}
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="tx-packer") as pool:
+        futures = [(owners, pool.submit(send, ixs)) for owners, ixs in batches]
+        for owners, fut in futures:
+            try:
+                outcome = {"signature": fut.result()}
+            except Exception as e:
+                outcome = {"error": str(e)}
+            for owner in owners:
+                results[owner] = dict(outcome)
+    return results
@@ -0,0 +1,80 @@
+"""
+uploads.py
+
+Streaming image uploads for /api/validate and /api/proof.
+
+install(app) makes Werkzeug write each uploaded file into a HashingSpool
+while it parses the multipart body. The SHA-256 is updated chunk by chunk
+as the bytes arrive. The file is kept in memory up to UPLOAD_SPOOL_BYTES
+and then rolls over to a temp file, so a request never holds more than
+that much of a photo on the heap.
+
+A file that grows past UPLOAD_MAX_BYTES is rejected with 413 as soon as it
+crosses the limit. A body whose Content-Length is already too large is
+rejected before any of it is read.
+"""
+
+import hashlib
+import os
+import tempfile
+
+from flask import Request, jsonify
+from werkzeug.exceptions import RequestEntityTooLarge
+
+UPLOAD_MAX_BYTES   = int(os.environ.get("UPLOAD_MAX_BYTES", 20 * 1024 * 1024))
+UPLOAD_SPOOL_BYTES = int(os.environ.get("UPLOAD_SPOOL_BYTES", 256 * 1024))
+FORM_OVERHEAD      = 64 * 1024  # other form fields and multipart framing
+CHUNK_SIZE         = 64 * 1024
+
+class HashingSpool:
+    """Writable upload stream that hashes what it is given and enforces UPLOAD_MAX_BYTES."""
+
+    def __init__(self, max_bytes: int = UPLOAD_MAX_BYTES, spool_bytes: int = UPLOAD_SPOOL_BYTES):
+        self.max_bytes = max_bytes
+        self.size = 0
+        self._sha = hashlib.sha256()
+        self._file = tempfile.SpooledTemporaryFile(max_size=spool_bytes)
+
+    def write(self, data: bytes) -> int:
+        self.size += len(data)
+        if self.size > self.max_bytes:
+            self._file.close()
+            raise RequestEntityTooLarge()
+        self._sha.update(data)
+        return self._file.write(data)
+
+    def hexdigest(self) -> str:
+        return self._sha.hexdigest()
+
+    def __iter__(self):
+        return iter(self._file)
+
+    def __getattr__(self, name):
+        # read/seek/close/... go to the spooled file
+        return getattr(self._file, name)
+
+class StreamingRequest(Request):
+    def _get_file_stream(self, total_content_length, content_type, filename=None, content_length=None):
+        return HashingSpool()
+
+def install(app):
+    """Stream and hash file uploads for `app`, and answer oversize ones with a JSON 413."""
+    app.request_class = StreamingRequest
+    if app.config.get("MAX_CONTENT_LENGTH") is None:
+        app.config["MAX_CONTENT_LENGTH"] = UPLOAD_MAX_BYTES + FORM_OVERHEAD
+
+    @app.errorhandler(RequestEntityTooLarge)
+    def upload_too_large(e):
+        return jsonify({"error": f"upload larger than {UPLOAD_MAX_BYTES} bytes"}), 413
+
+    return app
+
+def sha256_of(upload) -> str:
+    """Hex SHA-256 of an uploaded FileStorage, without reading it into memory at once."""
+    stream = upload.stream
+    if isinstance(stream, HashingSpool):
+        return stream.hexdigest()
+    sha = hashlib.sha256()
+    for chunk in iter(lambda: stream.read(CHUNK_SIZE), b""):
+        sha.update(chunk)
+    return sha.hexdigest()
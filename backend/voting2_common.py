@@ -0,0 +1,17 @@
+"""
+voting2_common.py
+
+Settings and scoring shared by serverVoting2.py and serverVoting2Async.py,
+kept apart so neither server has to import the other.
+"""
+
+import os
+
+# Evidence image hashed into every submission; its digest is cached in file_hashes
+LOCAL_IMAGE_PATH = os.environ.get("LOCAL_IMAGE_PATH", "IMG_7212.JPG")
+
+AIR_DROP_TOTAL_SOL = 100  # total SOL to split among wallets
+
+def map_score_to_points(score: int) -> int:
+    # Map a packaging score (0-100) to points (1-5)
+    return min(5, max(1, score // 20 + 1))
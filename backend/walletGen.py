@@ -1,4 +1,3 @@
-import json
 import secrets
 from solders.keypair import Keypair
 
@@ -7,12 +6,9 @@ def generate_random_password(length: int = 16) -> str:
 
 def generate_wallet():
     """
-    Generate a new Solana Keypair, save its secret key to disk,
-    and return (Keypair, password, wallet_filename).
+    Generate a new Solana Keypair and a random password.
+    Returns (Keypair, password); the secret key is stored by wallet_manager.
     """
     wallet = Keypair()
     password = generate_random_password()
-    wallet_filename = f"wallet_{wallet.pubkey()}.json"
-    with open(wallet_filename, "w") as f:
-        json.dump(list(wallet.to_bytes()), f)
-    return wallet, password, wallet_filename
+    return wallet, password
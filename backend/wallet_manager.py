@@ -1,38 +1,126 @@
+"""
+wallet_manager.py
+
+Wallet store for deployments without MongoDB. Wallets live in a SQLite
+database in WAL mode (WALLET_DB_PATH), one row per pubkey. A lookup is a
+single primary-key probe, every write is its own transaction, and after a
+crash the WAL is replayed on the next open. Concurrent signups from several
+threads or processes are serialised by SQLite's write lock.
+
+Secret keys are kept in the database rather than as wallet_<pubkey>.json
+files. A legacy wallets_db.json is imported the first time the database is
+opened, together with the wallet files it points at, and then renamed to
+wallets_db.json.imported.
+"""
+
 import json
 import os
-import hashlib
+import sqlite3
+import threading
+
+import auth
 
-DB = "wallets_db.json"
+DB = os.environ.get("WALLET_DB_PATH", "wallets.db")
+LEGACY_DB = "wallets_db.json"
 
-def load_db():
-    if os.path.exists(DB):
-        with open(DB, "r") as f:
-            return json.load(f)
-    return {}
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS wallets (
+    pubkey        TEXT PRIMARY KEY,
+    secret_key    TEXT,  -- JSON list of the keypair bytes
+    password_hash TEXT NOT NULL
+) WITHOUT ROWID;
+"""
 
-def save_db(db):
-    with open(DB, "w") as f:
-        json.dump(db, f, indent=4)
+_local = threading.local()
+_init_lock = threading.Lock()
+_initialized = False
+
+def _connection() -> sqlite3.Connection:
+    """Per-thread connection; the first one creates the schema."""
+    conn = getattr(_local, "conn", None)
+    if conn is None:
+        conn = sqlite3.connect(DB, timeout=30)
+        conn.execute("PRAGMA journal_mode=WAL")
+        # Signups are rare; pay the fsync so an acknowledged one survives power loss.
+        conn.execute("PRAGMA synchronous=FULL")
+        _init(conn)
+        _local.conn = conn
+    return conn
+
+def _init(conn: sqlite3.Connection):
+    global _initialized
+    with _init_lock:
+        if _initialized:
+            return
+        conn.executescript(SCHEMA)
+        _import_legacy(conn)
+        _initialized = True
+
+def _import_legacy(conn: sqlite3.Connection):
+    if not os.path.exists(LEGACY_DB):
+        return
+    with open(LEGACY_DB, "r") as f:
+        legacy = json.load(f)
+    rows = []
+    for pk, w in legacy.items():
+        secret_key = None
+        if os.path.exists(w.get("wallet_file") or ""):
+            with open(w["wallet_file"], "r") as f:
+                secret_key = json.dumps(json.load(f))
+        rows.append((pk, secret_key, w["password_hash"]))
+    with conn:
+        # Rows already in the database win over the old file.
+        conn.executemany(
+            "INSERT OR IGNORE INTO wallets (pubkey, secret_key, password_hash) VALUES (?, ?, ?)",
+            rows
+        )
+    os.replace(LEGACY_DB, LEGACY_DB + ".imported")
+    print(f"📦 Imported {len(legacy)} wallets from {LEGACY_DB}")
 
 def hash_password(pw: str) -> str:
-    return hashlib.sha256(pw.encode()).hexdigest()
+    return auth.hash_password(pw)
 
-def add_wallet(pubkey: str, wallet_file: str, password: str):
-    db = load_db()
-    db[pubkey] = {
-        "wallet_file": wallet_file,
-        "password_hash": hash_password(password)
-    }
-    save_db(db)
+def add_wallet(pubkey: str, secret_key: list, password: str):
+    pw_hash = hash_password(password)
+    conn = _connection()
+    with conn:
+        conn.execute(
+            "INSERT OR REPLACE INTO wallets (pubkey, secret_key, password_hash) VALUES (?, ?, ?)",
+            (pubkey, json.dumps(secret_key), pw_hash)
+        )
 
 def wallet_exists(pubkey: str) -> bool:
-    return pubkey in load_db()
+    row = _connection().execute(
+        "SELECT 1 FROM wallets WHERE pubkey = ?", (pubkey,)
+    ).fetchone()
+    return row is not None
 
 def get_wallet_info(pubkey: str):
-    return load_db().get(pubkey)
+    return {"pubkey": pubkey} if wallet_exists(pubkey) else None
 
 def verify_password(pubkey: str, password: str) -> bool:
-    info = get_wallet_info(pubkey)
-    if not info:
+    row = _connection().execute(
+        "SELECT password_hash FROM wallets WHERE pubkey = ?", (pubkey,)
+    ).fetchone()
+    if row is None:
         return False
-    return hash_password(password) == info["password_hash"]
+    stored = row[0]
+    ok, rehash = auth.check_password(stored, password)
+    if rehash:
+        conn = _connection()
+        with conn:
+            # Only replace the hash that was verified, in case it changed meanwhile.
+            conn.execute(
+                "UPDATE wallets SET password_hash = ? WHERE pubkey = ? AND password_hash = ?",
+                (hash_password(password), pubkey, stored)
+            )
+    return ok
+
+def load_keypair_from_db(pubkey: str):
+    from solders.keypair import Keypair
+    row = _connection().execute(
+        "SELECT secret_key FROM wallets WHERE pubkey = ?", (pubkey,)
+    ).fetchone()
+    if not row or not row[0]:
+        return None
+    return Keypair.from_bytes(bytes(json.loads(row[0])))
@@ -1,12 +1,12 @@
 from pymongo import MongoClient
-import hashlib
+import auth
 
 client = MongoClient("mongodb://localhost:27017/")
 db     = client["sasehacks"]
 col    = db["wallets"]
 
 def hash_password(pw: str) -> str:
-    return hashlib.sha256(pw.encode()).hexdigest()
+    return auth.hash_password(pw)
 
 def add_wallet(pubkey: str, secret_key: list, password: str):
     col.insert_one({
@@ -25,10 +25,7 @@ def get_wallet_info(pubkey: str):
     return doc
 
 def verify_password(pubkey: str, password: str) -> bool:
-    doc = col.find_one({"_id": pubkey})
-    if not doc:
-        return False
-    return hash_password(password) == doc["password_hash"]
+    return auth.verify(col, pubkey, password)
 
 def load_keypair_from_db(pubkey: str):
     from solders.keypair import Keypair
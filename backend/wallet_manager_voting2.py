@@ -1,20 +1,22 @@
 from pymongo import MongoClient
-import hashlib
+import auth
 from solders.keypair import Keypair
 
+import points_ledger
+from award_buffer import awards
+
 client = MongoClient("mongodb://localhost:27017/")
 db = client["sasehacks"]
 col = db["wallets"]
 
 def hash_password(pw: str) -> str:
-    return hashlib.sha256(pw.encode()).hexdigest()
+    return auth.hash_password(pw)
 
 def add_wallet(pubkey: str, secret_key: list, password: str):
     col.insert_one({
         "_id": pubkey,
         "secret_key": secret_key,
-        "password_hash": hash_password(password),
-        "points": 0
+        "password_hash": hash_password(password)
     })
 
 def wallet_exists(pubkey: str) -> bool:
@@ -24,14 +26,11 @@ def get_wallet_info(pubkey: str):
     doc = col.find_one({"_id": pubkey}, {"secret_key": 0, "password_hash": 0})
     if doc:
         doc["pubkey"] = pubkey
-        doc["points"] = doc.get("points", 0)
+        doc["points"] = get_points(pubkey)
     return doc
 
 def verify_password(pubkey: str, password: str) -> bool:
-    doc = col.find_one({"_id": pubkey})
-    if not doc:
-        return False
-    return hash_password(password) == doc["password_hash"]
+    return auth.verify(col, pubkey, password)
 
 def load_keypair_from_db(pubkey: str):
     doc = col.find_one({"_id": pubkey}, {"secret_key": 1})
@@ -39,12 +38,16 @@ def load_keypair_from_db(pubkey: str):
         return None
     return Keypair.from_bytes(bytes(doc["secret_key"]))
 
-def add_points(pubkey: str, pts: int):
-    col.update_one({"_id": pubkey}, {"$inc": {"points": pts}})
+def add_points(pubkey: str, pts: int, submission_id: str = None):
+    points_ledger.record(pubkey, pts, submission_id)
+
+def award_points(pubkey: str, pts: int, submission_id: str = None) -> int:
+    """add_points() through the write-coalescing buffer; returns the new total."""
+    return awards.award(pubkey, pts, submission_id)
 
 def get_points(pubkey: str) -> int:
-    doc = col.find_one({"_id": pubkey}, {"points": 1})
-    return doc["points"] if doc else 0
+    """Points earned in the open epoch."""
+    return points_ledger.points_of(pubkey)
 
 def get_all_points() -> dict:
-    return {d["_id"]: d.get("points", 0) for d in col.find({}, {"points": 1})}
+    return points_ledger.all_points()
@@ -0,0 +1,72 @@
+"""
+wallet_repo.py
+
+Repository over the `wallets` collection for the voting2 servers. Each route
+asks for one projection profile that covers every field it needs. The
+wallet is then read once per request and kept in a request-scoped identity
+map (flask.g). Later lookups of the same wallet in the same request are
+served from memory, and only a lookup that needs fields not loaded yet goes
+back to Mongo.
+"""
+
+from flask import g, has_app_context
+
+# Fields each route needs; "_id" is always returned.
+PROFILES = {
+    "exists": (),
+    "signin": ("password_hash",),
+    "wallet": ("password_hash",),
+}
+
+def projection(profile: str) -> dict:
+    return {f: 1 for f in PROFILES[profile]} or {"_id": 1}
+
+class WalletRecord:
+    __slots__ = ("pubkey", "password_hash", "loaded")
+
+    def __init__(self, pubkey: str, password_hash: str = None, loaded: frozenset = frozenset()):
+        self.pubkey = pubkey
+        self.password_hash = password_hash
+        self.loaded = loaded
+
+    @classmethod
+    def from_doc(cls, doc: dict, fields) -> "WalletRecord":
+        return cls(doc["_id"], doc.get("password_hash"), frozenset(fields))
+
+    def merge(self, other: "WalletRecord") -> "WalletRecord":
+        for field in other.loaded:
+            setattr(self, field, getattr(other, field))
+        self.loaded |= other.loaded
+        return self
+
+    def public_info(self, points: int) -> dict:
+        # Same shape as wallet_manager_voting2.get_wallet_info
+        return {"_id": self.pubkey, "pubkey": self.pubkey, "points": points}
+
+class WalletRepository:
+    def __init__(self, col):
+        self.col = col
+        self._identity = {}  # pubkey -> WalletRecord, or None if not found
+
+    def get(self, pubkey: str, profile: str = "exists"):
+        fields = PROFILES[profile]
+        if pubkey in self._identity:
+            record = self._identity[pubkey]
+            if record is None or record.loaded.issuperset(fields):
+                return record
+        doc = self.col.find_one({"_id": pubkey}, projection(profile))
+        if doc is None:
+            self._identity[pubkey] = None
+            return None
+        record = WalletRecord.from_doc(doc, fields)
+        known = self._identity.get(pubkey)
+        self._identity[pubkey] = known.merge(record) if known else record
+        return self._identity[pubkey]
+
+def request_wallets(col) -> WalletRepository:
+    """The repository for the current request, or a fresh one outside a request."""
+    if not has_app_context():
+        return WalletRepository(col)
+    if "wallet_repo" not in g:
+        g.wallet_repo = WalletRepository(col)
+    return g.wallet_repo